@@ -0,0 +1,230 @@
+# Parses commit messages into changelog entries. Used by changelog-generator.
+#
+# Every line of every commit passes through parse_commit(), so the patterns are
+# compiled once, and each one is only tried on lines that can possibly match it,
+# judging by the first character, or by a cheaper pattern.
+
+import re
+
+JIRA_REGEX = r"(?:Jira:? *)?(?:https?://tracker.mender.io/browse/)?((?:INF|ARCHIVE|MEN|QA|MC)(?:-| )[0-9]+)"
+TRACKER_REGEX = r"\(?(?:Ref:? *)?%s\)?:? *" % (JIRA_REGEX)
+
+TRACKER_RE = re.compile(TRACKER_REGEX, re.IGNORECASE)
+# Every tracker reference contains a "-" or a space followed by a digit. This is
+# much cheaper to search for than TRACKER_RE, which is case insensitive and can
+# start in many ways, so only lines which have it are searched for references.
+TRACKER_HINT_RE = re.compile(r"[- ][0-9]")
+CHANGELOG_RE = re.compile(r"^ *Changelog: *(.*)", re.IGNORECASE)
+# The logic of this regex is:
+# - Shall start with Title|Commit|All|None
+# - From here, if [.:]+ then capture the rest in a new group
+# - Else just expect end line
+CHANGELOG_KEYWORD_RE = re.compile(
+    r"^(Title|Commit|All|None) *(?:[.:]+ *(.*)$|$)", re.IGNORECASE
+)
+CANCEL_CHANGELOG_RE = re.compile(r"^ *Cancel-Changelog: *([0-9a-f]+).*", re.IGNORECASE)
+REVERT_RE = re.compile(r"^This reverts commit ([0-9a-f]+).*", re.IGNORECASE)
+CHERRY_PICK_RE = re.compile(
+    r"^\(cherry picked from commit ([0-9a-f]+)\)", re.IGNORECASE
+)
+# Use a slightly stricter filter for other "<something>-by:" messages than for
+# "Signed-off-by:", to avoid false positives.
+TRAILER_RE = re.compile(r"^(Signed-off-by:|\S+-by:.*>\s*$)", re.IGNORECASE)
+
+
+def add_entry(entries, sha, msg):
+    if msg.lower().strip() == "none":
+        return
+
+    sha_list = entries.get(sha)
+    if sha_list is None:
+        sha_list = []
+    sha_list.append(msg)
+    entries[sha] = sha_list
+
+
+def parse_commit(sha, content):
+    """Parses the raw content of commit sha, and returns what it means for the
+    changelog as a list of operations, which apply_commit() carries out. The
+    result only depends on the commit, so it can be cached by SHA. Each
+    operation is a pair:
+
+    - ["entry", msg]: Add msg to the entries of the commit.
+    - ["tracker", id]: The commit refers to bugtracker ticket id.
+    - ["cancel", sha]: Remove the entries of sha, and of commits linked to it.
+    - ["link", sha]: The commit is a cherry-pick of sha.
+    - ["problem", text]: Something to be checked manually.
+    """
+
+    ops = []
+    title_fetched = False
+    title = ""
+    commit_msg = ""
+    log_entry_commit = False
+    log_entry_local = False
+    log_entry = ""
+    exclusive_tag_seen = False
+
+    text = content.decode()
+    lines = text.split("\n")
+    if text.endswith("\n"):
+        lines.pop()
+    # The message starts after the first empty line, the rest is the header.
+    try:
+        start = lines.index("") + 1
+    except ValueError:
+        start = len(lines)
+
+    for line in lines[start:]:
+        line = line.rstrip("\r")
+        if line == "":
+            if log_entry:
+                ops.append(["entry", log_entry])
+                log_entry = ""
+            log_entry_local = False
+
+            # No pattern matches an empty line, it can only be the title, or
+            # go into the commit message.
+            title_fetched = True
+            if commit_msg:
+                commit_msg += "\n"
+            continue
+
+        # Tracker reference, remove from string.
+        if TRACKER_HINT_RE.search(line):
+            trackers = TRACKER_RE.findall(line)
+        else:
+            trackers = []
+        if trackers:
+            for tracker in trackers:
+                ops.append(["tracker", tracker])
+            # Removing a reference may join the remains into a new one, so
+            # repeat the removal once per reference, for as long as it removes
+            # anything.
+            for tracker in trackers:
+                line, count = TRACKER_RE.subn("", line)
+                line = line.strip(" ")
+                if count == 0:
+                    break
+
+        if not title_fetched:
+            title = line
+            title_fetched = True
+
+        first = line[:1]
+        if first == " ":
+            first = line.lstrip(" ")[:1]
+
+        if first == "C" or first == "c":
+            match_changelog = CHANGELOG_RE.match(line)
+            if match_changelog:
+                if log_entry:
+                    ops.append(["entry", log_entry])
+                    log_entry = ""
+                log_entry_local = False
+
+                match_keyword = CHANGELOG_KEYWORD_RE.match(match_changelog.group(1))
+                if match_keyword:
+                    if exclusive_tag_seen:
+                        # This doesn't really mean that the tags are exclusive, but rather that it
+                        # is quite uncommon to see any of them together, and might indicate a
+                        # squashed commit.
+                        ops.append(
+                            [
+                                "problem",
+                                "*** Commit %s had conflicting changelog tags. "
+                                "This might be a squashed commit which will not work correctly with changelogs. "
+                                "Should be manually checked." % sha,
+                            ]
+                        )
+                    exclusive_tag_seen = True
+
+                    keyword = match_keyword.group(1).lower()
+                    if keyword == "title":
+                        log_entry = title
+                    elif keyword == "none":
+                        log_entry_commit = False
+                    elif keyword in ["commit", "all"]:
+                        log_entry_commit = True
+                        if match_keyword.group(2):
+                            # Log the rest of the line
+                            if commit_msg:
+                                commit_msg += "\n"
+                            commit_msg += match_keyword.group(2)
+                else:
+                    log_entry_local = True
+                    log_entry = match_changelog.group(1)
+                continue
+
+            match = CANCEL_CHANGELOG_RE.match(line)
+        elif line[:1] == "T" or line[:1] == "t":
+            match = REVERT_RE.match(line)
+        else:
+            match = None
+        if match:
+            if log_entry:
+                ops.append(["entry", log_entry])
+                log_entry = ""
+            log_entry_local = False
+
+            ops.append(["cancel", match.group(1)])
+
+        if line[:1] == "(":
+            match = CHERRY_PICK_RE.match(line)
+            if match:
+                if log_entry:
+                    ops.append(["entry", log_entry])
+                    log_entry = ""
+                log_entry_local = False
+
+                ops.append(["link", match.group(1)])
+                continue
+
+        if "-" in line and TRAILER_RE.match(line):
+            # Ignore such lines.
+            continue
+
+        if log_entry_local:
+            log_entry += "\n" + line
+        else:
+            if commit_msg:
+                commit_msg += "\n"
+            commit_msg += line
+
+    if log_entry_commit:
+        ops.append(["entry", commit_msg])
+    if log_entry:
+        ops.append(["entry", log_entry])
+
+    return ops
+
+
+def apply_commit(sha, ops, entries, linked_shas_map, sha_to_tracker, problems):
+    """Carries out the operations returned by parse_commit() for commit sha."""
+
+    for op, value in ops:
+        if op == "entry":
+            add_entry(entries, sha, value)
+        elif op == "tracker":
+            if not sha_to_tracker.get(sha):
+                sha_to_tracker[sha] = set()
+            sha_to_tracker[sha].add(value)
+        elif op == "cancel":
+            linked_shas = [value]
+            if linked_shas_map.get(value):
+                for linked_sha in linked_shas_map.get(value):
+                    linked_shas.append(linked_sha)
+            for linked_sha in linked_shas:
+                if linked_shas_map.get(linked_sha):
+                    del linked_shas_map[linked_sha]
+                if entries.get(linked_sha):
+                    del entries[linked_sha]
+        elif op == "link":
+            if not linked_shas_map.get(sha):
+                linked_shas_map[sha] = []
+            linked_shas_map[sha].append(value)
+            if not linked_shas_map.get(value):
+                linked_shas_map[value] = []
+            linked_shas_map[value].append(sha)
+        elif op == "problem":
+            problems.append(value)
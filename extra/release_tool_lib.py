@@ -0,0 +1,5300 @@
+# Copyright 2021 Northern.tech AS
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+# The implementation of release_tool.py, which can also be imported by other
+# tools. See README-release_tool.md for usage.
+
+import argparse
+import atexit
+import bisect
+import concurrent.futures
+import contextlib
+import copy
+import difflib
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import weakref
+import logging
+import datetime
+
+# Disable pager during menu navigation.
+os.environ["GIT_PAGER"] = "cat"
+
+JENKINS_SERVER = "https://mender-jenkins.mender.io"
+JENKINS_JOB = "job/mender-builder"
+JENKINS_CREDS_MISSING_ERR = """Jenkins credentials not found. Possible locations:
+- JENKINS_USER / JENKINS_PASSWORD environment variables
+- 'pass' password management storage."""
+
+GITLAB_SERVER = "https://gitlab.com/api/v4"
+GITLAB_JOB = "projects/Northern.tech%2FMender%2Fmender-qa"
+GITLAB_CREDS_MISSING_ERR = """GitLab credentials not found. Possible locations:
+- GITLAB_TOKEN environment variable
+- 'pass' password management storage, under "token" label."""
+
+# What we use in commits messages when bumping versions.
+VERSION_BUMP_STRING = "Bump versions for Mender"
+
+# How many commands to run at the same time, in operations that support it,
+# unless --jobs says otherwise.
+DEFAULT_JOBS = 8
+# How many times network operations are retried, and the initial delay between
+# retries in seconds. The delay doubles after each attempt.
+RETRIES = 3
+RETRY_DELAY = 2.0
+
+# How long, in seconds, a document fetched over HTTP, such as the build
+# parameters, is used from the on-disk cache before asking the server whether it
+# has changed.
+HTTP_CACHE_TTL = 3600
+
+# Bump this whenever the format of anything stored in the on-disk cache changes,
+# so that old entries are ignored instead of misinterpreted.
+CACHE_FORMAT_VERSION = 1
+
+
+class NotAVersionException(Exception):
+    pass
+
+
+class GitObjectMissingException(Exception):
+    pass
+
+
+class Component:
+    """A git repository, Docker image, Docker container or docker-compose service
+    ("yml"), as listed in component-maps.yml.
+
+    Components are interned values: creating a component with the same name and
+    type twice returns the same object, and components cannot be modified. All
+    queries are answered from a ComponentIndex built once from the maps."""
+
+    __slots__ = ("name", "type")
+
+    INDEX = None
+    INSTANCES = {}
+
+    def __new__(cls, name, type):
+        comp = Component.INSTANCES.get((name, type))
+        if comp is None:
+            comp = object.__new__(cls)
+            object.__setattr__(comp, "name", name)
+            object.__setattr__(comp, "type", type)
+            comp = Component.INSTANCES.setdefault((name, type), comp)
+        return comp
+
+    def __setattr__(self, attr, value):
+        raise AttributeError("Component objects cannot be modified")
+
+    def __reduce__(self):
+        # Go through __new__ when unpickling and copying, so that the result is
+        # interned too.
+        return (Component, (self.name, self.type))
+
+    def __repr__(self):
+        return "Component(%r, %r)" % (self.name, self.type)
+
+    def git(self):
+        if self.type != "git":
+            raise Exception("Tried to get git name from non-git component")
+        return self.name
+
+    def docker_container(self):
+        if self.type != "docker_container":
+            raise Exception(
+                "Tried to get docker_container name from non-docker_container component"
+            )
+        return self.name
+
+    def docker_image(self):
+        if self.type != "docker_image":
+            raise Exception(
+                "Tried to get docker_image name from non-docker_image component"
+            )
+        return self.name
+
+    def yml(self):
+        if self.type != "yml":
+            raise Exception("Tried to get yml name from non-yml component")
+        return self.name
+
+    @staticmethod
+    def _initialize_component_maps():
+        if Component.INDEX is None:
+            Component.INDEX = ComponentIndex(
+                load_yaml_file(os.path.join(integration_dir(), "component-maps.yml"))
+            )
+
+    @staticmethod
+    def get_component_of_type(type, name):
+        Component._initialize_component_maps()
+        comp = Component.INDEX.by_name[type].get(name)
+        if comp is None:
+            raise KeyError("Component '%s' of type %s not found" % (name, type))
+        return comp
+
+    @staticmethod
+    def get_component_of_any_type(name):
+        for type in ["git", "docker_image", "docker_container"]:
+            try:
+                return Component.get_component_of_type(type, name)
+            except KeyError:
+                continue
+        raise KeyError("Component '%s' not found" % name)
+
+    @staticmethod
+    def get_components_of_type(
+        type,
+        only_release=None,
+        only_non_release=False,
+        only_independent_component=False,
+    ):
+        """Returns the components of the given type, sorted by name."""
+
+        Component._initialize_component_maps()
+        if only_release is None:
+            if only_non_release:
+                only_release = False
+            else:
+                only_release = True
+        if only_release and only_non_release:
+            raise Exception("only_release and only_non_release can't both be true")
+        return list(
+            Component.INDEX.filtered(
+                type, only_release, only_non_release, only_independent_component
+            )
+        )
+
+    def associated_components_of_type(self, type):
+        """Returns all components of type `type` that are associated with self."""
+
+        Component._initialize_component_maps()
+
+        if type == self.type:
+            return [self]
+
+        comps = Component.INDEX.associated.get((self, type))
+        if comps is None:
+            raise KeyError(
+                "No such combination: Component '%s' of type %s doesn't have any associated components of type %s"
+                % (self.name, self.type, type)
+            )
+        return list(comps)
+
+    def yml_components(self):
+        """Returns the name of the service in our YML docker-compose files. This is
+        usually the same as the docker_image name, but for services that don't
+        have Docker images, it will be the git name, which is what is used in
+        the other-components.yml file."""
+
+        Component._initialize_component_maps()
+        return list(Component.INDEX.yml_components(self))
+
+    def is_release_component(self):
+        Component._initialize_component_maps()
+        return Component.INDEX.release[self]
+
+    def is_independent_component(self):
+        Component._initialize_component_maps()
+        return Component.INDEX.independent[self]
+
+
+class ComponentIndex:
+    """Everything component-maps.yml says about each component, worked out once
+    so that the queries of Component are dictionary lookups."""
+
+    def __init__(self, maps):
+        # type -> name -> Component
+        self.by_name = {}
+        # (Component, type) -> associated components of that type
+        self.associated = {}
+        # Component -> whether it is a release component
+        self.release = {}
+        # Component -> whether its git repository is an independent component
+        self.independent = {}
+        # Memoized results of filtered() and yml_components().
+        self.filtered_cache = {}
+        self.yml_cache = {}
+
+        for type, components in maps.items():
+            self.by_name[type] = {}
+            for name in sorted(components.keys()):
+                comp = Component(name, type)
+                self.by_name[type][name] = comp
+                self.release[comp] = components[name]["release_component"]
+                for other_type in ["git", "docker_image", "docker_container"]:
+                    if other_type == type or other_type not in components[name]:
+                        continue
+                    self.associated[(comp, other_type)] = tuple(
+                        Component(other_name, other_type)
+                        for other_name in components[name][other_type]
+                    )
+
+        for comp in self.release:
+            if comp.type == "git":
+                gits = (comp,)
+            else:
+                gits = self.associated.get((comp, "git"), ())
+            self.independent[comp] = len(gits) > 0 and bool(
+                maps["git"].get(gits[0].name, {}).get("independent_component")
+            )
+
+    def filtered(self, type, only_release, only_non_release, only_independent):
+        """Returns the components of type, sorted by name, after applying the
+        filters of Component.get_components_of_type()."""
+
+        key = (type, only_release, only_non_release, only_independent)
+        comps = self.filtered_cache.get(key)
+        if comps is None:
+            comps = tuple(
+                comp
+                for comp in self.by_name[type].values()
+                if not (only_independent and not self.independent[comp])
+                and not (only_non_release and self.release[comp])
+                and not (only_release and not self.release[comp])
+            )
+            self.filtered_cache[key] = comps
+        return comps
+
+    def yml_components(self, comp):
+        """See Component.yml_components()."""
+
+        comps = self.yml_cache.get(comp)
+        if comps is None:
+            comps = comp.associated_components_of_type("docker_image")
+            if len(comps) == 0:
+                # For the fake services that don't have Docker images, but
+                # reside in other-components.yml.
+                comps = comp.associated_components_of_type("git")
+            comps = tuple(Component(c.name, "yml") for c in comps)
+            self.yml_cache[comp] = comps
+        return comps
+
+
+# A map from git repo name to build parameter name in CI scripts.
+GIT_TO_BUILDPARAM_MAP = {
+    "mender-api-gateway-docker": "MENDER_API_GATEWAY_DOCKER_REV",
+    "deployments": "DEPLOYMENTS_REV",
+    "deployments-enterprise": "DEPLOYMENTS_ENTERPRISE_REV",
+    "deviceauth": "DEVICEAUTH_REV",
+    "gui": "GUI_REV",
+    "inventory": "INVENTORY_REV",
+    "inventory-enterprise": "INVENTORY_ENTERPRISE_REV",
+    "tenantadm": "TENANTADM_REV",
+    "useradm": "USERADM_REV",
+    "useradm-enterprise": "USERADM_ENTERPRISE_REV",
+    "workflows": "WORKFLOWS_REV",
+    "workflows-enterprise": "WORKFLOWS_ENTERPRISE_REV",
+    "create-artifact-worker": "CREATE_ARTIFACT_WORKER_REV",
+    "mender": "MENDER_REV",
+    "mender-artifact": "MENDER_ARTIFACT_REV",
+    "mender-cli": "MENDER_CLI_REV",
+    "meta-mender": "META_MENDER_REV",
+    "integration": "INTEGRATION_REV",
+    "mender-qa": "MENDER_QA_REV",
+    "auditlogs": "AUDITLOGS_REV",
+    "mtls-ambassador": "MTLS_AMBASSADOR_REV",
+    "deviceconnect": "DEVICECONNECT_REV",
+    "mender-connect": "MENDER_CONNECT_REV",
+    "deviceconfig": "DEVICECONFIG_REV",
+}
+
+# categorize backend services wrt open/enterprise versions
+# important for test suite selection
+BACKEND_SERVICES_OPEN = {
+    "deviceauth",
+    "deviceconnect",
+    "create-artifact-worker",
+    "deviceconfig",
+}
+BACKEND_SERVICES_ENT = {
+    "tenantadm",
+    "deployments-enterprise",
+    "inventory-enterprise",
+    "useradm-enterprise",
+    "workflows-enterprise",
+    "auditlogs",
+    "mtls-ambassador",
+}
+BACKEND_SERVICES_OPEN_ENT = {"deployments", "inventory", "useradm", "workflows"}
+BACKEND_SERVICES = (
+    BACKEND_SERVICES_OPEN | BACKEND_SERVICES_ENT | BACKEND_SERVICES_OPEN_ENT
+)
+
+# The integration test suites which --select-test-suite --node-ids picks tests
+# from, relative to the integration repository, and the containers that every
+# test in the suite is assumed to use, on top of those found by scanning it.
+TEST_SUITES = {
+    "backend-tests/tests": set(),
+    "tests/tests": {"mender-client"},
+}
+# The containers which every test uses, whether it refers to them or not. All
+# requests go through the API gateway, so a change in it can break any test.
+TEST_IMPLICIT_CONTAINERS = {"mender-api-gateway"}
+# Git components which are built into a container, but which component-maps.yml
+# doesn't list for it, because they have no image of their own.
+TEST_CONTAINER_COMPONENTS = {"mender-client": {"mender-connect"}}
+# Git components of tools which the tests run, and which are found by name in
+# the commands of the tests.
+TEST_TOOLS = {"mender-artifact", "mender-cli"}
+# The containers which the setups of the container factory start on top of the
+# backend, by the name of the factory method. The containers of the backend
+# itself are found through the API URLs and names which the tests use.
+TEST_SETUP_CONTAINERS = {
+    "getEnterpriseSetup": {"mender-tenantadm", "mender-auditlogs"},
+    "getEnterpriseSMTPSetup": {"mender-tenantadm", "mender-auditlogs"},
+    "getMTLSSetup": {"mender-tenantadm", "mender-auditlogs", "mtls-ambassador"},
+}
+# The docker-compose files which every setup of the container factory starts,
+# and whose containers are therefore called by each other in every test. Calls
+# made by containers only in other setups are covered by TEST_SETUP_CONTAINERS.
+TEST_COMPOSE_FILES = [
+    "docker-compose.yml",
+    "docker-compose.storage.minio.yml",
+    "docker-compose.config.yml",
+    "docker-compose.connect.yml",
+    "docker-compose.testing.yml",
+]
+# Fixtures which set up an environment without Mender clients. Tests using only
+# these don't use the client containers of their suite.
+NO_CLIENT_FIXTURE_REGEX = re.compile(r"(no|without)_client")
+# Modules which are not scanned for the containers a test uses, because they
+# refer to all of them when starting and stopping the environment.
+TEST_IMPACT_SKIPPED_MODULES = ["testutils/infra/container_manager"]
+# Matches the service in API URLs, which is served by the "mender-<service>"
+# container, unless listed in API_SERVICE_CONTAINERS.
+API_URL_REGEX = re.compile(r"/api/(?:management|devices|internal)/[^/]+/([a-z]+)")
+API_SERVICE_CONTAINERS = {
+    "devauth": "mender-device-auth",
+    "workflows": "mender-workflows-server",
+}
+# Matches words which may be container or tool names, in strings of the tests,
+# such as "mender-device-auth:8080" or "mender-artifact write", and in the
+# environment of docker-compose services, such as
+# "http://mender-workflows-server:8080/".
+CONTAINER_NAME_REGEX = re.compile(r"[\w-]+")
+
+
+class BuildParam:
+    type = None
+    value = None
+
+    def __init__(self, type, value):
+        self.type = type
+        self.value = value
+
+    def __repr__(self):
+        return "{0.type}:'{0.value}'".format(self)
+
+
+def print_line():
+    print(
+        "--------------------------------------------------------------------------------"
+    )
+
+
+def get_value_from_password_storage(server, key):
+    """Gets a value from the 'pass' password storage framework. 'server' is the
+    server string which should be used to look up the key. If key is None, it
+    returns the first line, which is usually the password. Other lines are
+    treated as "key: value" pairs. 'key' can be either a string or a list of
+    strings."""
+
+    if type(key) is str:
+        keys = [key]
+    else:
+        keys = key
+
+    try:
+        # Remove https prefix.
+        if server.startswith("https://"):
+            server = server[len("https://") :]
+        # Remove address part.
+        if "/" in server:
+            server = server[: server.index("/")]
+
+        pass_dir = os.getenv("PASSWORD_STORE_DIR")
+        if not pass_dir:
+            pass_dir = os.path.join(os.getenv("HOME"), ".password-store")
+
+        server_path_str = os.getenv("PASS_GITLAB_COM")
+
+        if not server_path_str:
+            output = subprocess.check_output(
+                ["find", pass_dir, "-type", "f", "-path", "*%s*" % server]
+            ).decode()
+            count = 0
+            server_paths = []
+            for line in output.split("\n"):
+                if line == "":
+                    continue
+                if line.startswith("%s/" % pass_dir):
+                    line = line[len("%s/" % pass_dir) :]
+                if line.endswith(".gpg"):
+                    line = line[: -len(".gpg")]
+                server_paths.append(line)
+                count += 1
+            if count == 0:
+                return None
+            elif count > 1:
+                print(
+                    "More than one eligible candidate in 'pass' storage for %s:\n- %s"
+                    % (server, "\n- ".join(server_paths))
+                )
+                print(
+                    "Selecting the shortest one. If you wish to override, please set PASS_GITLAB_COM to the correct value."
+                )
+
+            server_path_str = sorted(server_paths, key=len)[0]
+
+        print("Attempting to fetch credentials from 'pass' %s..." % (server_path_str))
+
+        with trace("subprocess", "pass show"):
+            output = subprocess.check_output(["pass", "show", server_path_str])
+        output = output.decode()
+        line_no = 0
+        for line in output.split("\n"):
+            line_no += 1
+
+            if keys is None and line_no == 1:
+                return line
+
+            if line.find(":") < 0:
+                continue
+
+            key, value = line.split(":", 1)
+            key = key.strip()
+            value = value.strip()
+            if key in keys:
+                return value
+
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def init_jenkins_creds(context=None):
+    if context is None:
+        context = CONTEXT
+    context.jenkins_user = os.getenv("JENKINS_USER")
+    context.jenkins_password = os.getenv("JENKINS_PASSWORD")
+
+    if context.jenkins_user is not None and context.jenkins_password is not None:
+        return
+
+    context.jenkins_user = get_value_from_password_storage(
+        JENKINS_SERVER, ["login", "user", "username"]
+    )
+    context.jenkins_password = get_value_from_password_storage(JENKINS_SERVER, None)
+
+
+def init_gitlab_creds(context=None):
+    if context is None:
+        context = CONTEXT
+    context.gitlab_token = os.getenv("GITLAB_TOKEN")
+    if context.gitlab_token is None:
+        context.gitlab_token = get_value_from_password_storage(GITLAB_SERVER, "token")
+
+
+def import_yaml():
+    """Returns the PyYAML module. It is imported on first use, since importing it
+    is a noticeable part of the startup time, and many operations never need
+    it."""
+
+    try:
+        import yaml
+    except ImportError:
+        print("PyYAML missing, try running 'sudo pip3 install pyyaml'.")
+        sys.exit(2)
+    return yaml
+
+
+def load_yaml(stream):
+    """Parses YAML from a string or file, like yaml.safe_load(), but with the C
+    implementation from libyaml when PyYAML was built with it."""
+
+    yaml = import_yaml()
+    return yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def dump_yaml(data):
+    """Returns data serialized as YAML. See load_yaml()."""
+
+    yaml = import_yaml()
+    return yaml.dump(data, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper))
+
+
+def load_yaml_file(filename):
+    """Parses the YAML file filename. The result is cached on disk as JSON, which
+    is much faster to load, until the path, modification time, size or inode of
+    the file changes. Files whose content cannot be represented exactly in JSON
+    are parsed every time."""
+
+    filename = os.path.realpath(filename)
+    stat = os.stat(filename)
+    file_id = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+    cache_key = hashlib.sha1(filename.encode()).hexdigest()
+    cached = read_cache("yaml-files", cache_key)
+    if cached is not None and cached.get("file_id") == file_id:
+        return cached["data"]
+
+    with open(filename) as fd:
+        data = load_yaml(fd)
+    try:
+        exact = json.loads(json.dumps(data)) == data
+    except (TypeError, ValueError):
+        exact = False
+    if exact:
+        write_cache("yaml-files", cache_key, {"file_id": file_id, "data": data})
+    return data
+
+
+def integration_dir():
+    """Return the location of the integration repository."""
+
+    if os.path.isabs(sys.argv[0]):
+        return os.path.normpath(os.path.dirname(os.path.dirname(sys.argv[0])))
+    else:
+        return os.path.normpath(
+            os.path.join(os.getcwd(), os.path.dirname(sys.argv[0]), "..")
+        )
+
+
+def cache_dir():
+    """Return the directory where the on-disk cache is kept, or None if caching
+    is disabled. The location can be changed with the RELEASE_TOOL_CACHE_DIR
+    environment variable, and setting it to an empty string disables the
+    cache."""
+
+    dir = os.environ.get("RELEASE_TOOL_CACHE_DIR")
+    if dir is None:
+        base = os.environ.get("XDG_CACHE_HOME")
+        if not base:
+            base = os.path.join(os.path.expanduser("~"), ".cache")
+        dir = os.path.join(base, "mender-release-tool")
+    elif dir == "":
+        return None
+    return dir
+
+
+def cache_path(category, key):
+    dir = cache_dir()
+    if dir is None:
+        return None
+    return os.path.join(dir, "v%d" % CACHE_FORMAT_VERSION, category, key + ".json")
+
+
+def read_cache(category, key):
+    """Return the cached value stored under category and key, or None if there is
+    no such entry."""
+
+    path = cache_path(category, key)
+    if path is None:
+        return None
+    try:
+        with open(path) as fd:
+            return json.load(fd)
+    except (OSError, ValueError):
+        # Missing or corrupt entry, both are just a cache miss.
+        return None
+
+
+def write_cache(category, key, value):
+    """Store value, which must be JSON serializable, under category and key. The
+    entry is written atomically, so concurrent readers never see a partial
+    entry. Failures are ignored, the cache is only an optimization."""
+
+    path = cache_path(category, key)
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(tmp_fd, "w") as fd:
+                json.dump(value, fd)
+            os.replace(tmp, path)
+        except:
+            os.remove(tmp)
+            raise
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+def http_get_cached(url, ttl=HTTP_CACHE_TTL, context=None, **kwargs):
+    """Returns the body of the document at url as a string, going through the
+    on-disk cache. Extra arguments are passed on to requests.get().
+
+    A cached copy younger than ttl seconds is used as is. An older one is
+    revalidated with a conditional request, using the ETag and Last-Modified
+    headers of the earlier reply, so an unchanged document is not downloaded
+    again. If the server can't be reached, an existing copy is used regardless
+    of age. In offline mode (context.offline) the network is never used, and
+    it is an error if there is no cached copy."""
+
+    if context is None:
+        context = CONTEXT
+    key = hashlib.sha1(url.encode()).hexdigest()
+    entry = read_cache("http", key)
+    if entry is not None and entry.get("url") != url:
+        entry = None
+
+    if context.offline:
+        if entry is None:
+            raise Exception(
+                (
+                    "There is no cached copy of %s, which is needed in offline mode. "
+                    + "Run once without --offline to fetch it."
+                )
+                % url
+            )
+        return entry["body"]
+
+    if entry is not None and 0 <= time.time() - entry["fetched"] < ttl:
+        return entry["body"]
+
+    try:
+        import requests
+    except ImportError:
+        print("requests module missing, try running 'sudo pip3 install requests'.")
+        sys.exit(2)
+
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        with context.trace("http", "GET %s" % url.split("/")[2], url=url) as details:
+            reply = requests.get(url, headers=headers, **kwargs)
+            details["status"] = reply.status_code
+        if reply.status_code != 304:
+            reply.raise_for_status()
+    except requests.exceptions.RequestException as err:
+        if entry is None:
+            raise
+        print(
+            "Could not fetch %s (%s). Using the copy from %s."
+            % (url, err, time.strftime("%c", time.localtime(entry["fetched"])))
+        )
+        return entry["body"]
+
+    if reply.status_code == 304 and entry is not None:
+        entry["fetched"] = time.time()
+    else:
+        entry = {
+            "url": url,
+            "fetched": time.time(),
+            "etag": reply.headers.get("ETag"),
+            "last_modified": reply.headers.get("Last-Modified"),
+            "body": reply.content.decode(),
+        }
+    write_cache("http", key, entry)
+    return entry["body"]
+
+
+def ask(text):
+    """Ask a question and return the reply."""
+
+    sys.stdout.write(text)
+    sys.stdout.flush()
+    reply = sys.stdin.readline().strip()
+    # Make a separator before next information chunk.
+    sys.stdout.write("\n")
+    return reply
+
+
+def filter_docker_compose_files_list(list, version):
+    """Returns a filtered list of known docker-compose files
+
+    version shall be one of "git", "docker".
+    """
+
+    assert version in ["git", "docker"]
+
+    _DOCKER_ONLY_YML = [
+        "docker-compose.yml",
+        "docker-compose.enterprise.yml",
+        "docker-compose.auditlogs.yml",
+        "docker-compose.connect.yml",
+        "docker-compose.config.yml",
+        "other-components-docker.yml",
+    ]
+    _GIT_ONLY_YML = ["git-versions.yml", "git-versions-enterprise.yml"]
+
+    def _is_known_yml_file(entry):
+        return (
+            entry.startswith("git-versions")
+            and entry.endswith(".yml")
+            or entry == "other-components.yml"
+            or entry == "other-components-docker.yml"
+            or (entry.startswith("docker-compose") and entry.endswith(".yml"))
+        )
+
+    return [
+        entry
+        for entry in list
+        if _is_known_yml_file(entry)
+        and (
+            version == "all"
+            or (
+                (version == "git" and entry in _GIT_ONLY_YML)
+                or (version == "docker" and entry in _DOCKER_ONLY_YML)
+                or (entry not in _GIT_ONLY_YML + _DOCKER_ONLY_YML)
+            )
+        )
+    ]
+
+
+def docker_compose_files_list(dir, version):
+    """Return all docker-compose*.yml files in given directory."""
+    return [
+        os.path.join(dir, entry)
+        for entry in filter_docker_compose_files_list(os.listdir(dir), version)
+    ]
+
+
+def get_docker_compose_data_from_json_list(json_list):
+    """Return the Yaml as a simplified structure from the json list. See
+    get_docker_compose_data_from_parsed_list."""
+
+    return get_docker_compose_data_from_parsed_list(
+        [load_yaml(json_str) for json_str in json_list]
+    )
+
+
+def get_docker_compose_data_from_parsed_list(parsed_list):
+    """Return the parsed Yaml documents as a simplified structure:
+    {
+        image_name: {
+            "container": container_name,
+            "image_prefix": "mendersoftware/" or "someserver.mender.io/blahblah",
+            "version": version,
+        }
+    }
+    """
+    data = {}
+    for json_elem in parsed_list:
+        for container, cont_info in json_elem["services"].items():
+            full_image = cont_info.get("image")
+            if full_image is None or (
+                "mendersoftware" not in full_image and "mender.io" not in full_image
+            ):
+                continue
+            split = full_image.rsplit("/", 1)
+            prefix = split[0]
+            split = split[1].split(":", 1)
+            image = split[0]
+            ver = split[1]
+            if data.get(image) is not None:
+                raise Exception(
+                    (
+                        "More than one container is using the image name '%s'. "
+                        + "The tool currently does not support this."
+                    )
+                    % image
+                )
+            data[image] = {
+                "container": container,
+                "image_prefix": prefix,
+                "version": ver,
+            }
+
+    return data
+
+
+def get_docker_compose_data(dir, version="git"):
+    """Return docker-compose data from all the YML files in the directory.
+    See get_docker_compose_data_from_parsed_list."""
+
+    return get_docker_compose_data_from_parsed_list(
+        [
+            load_yaml_file(filename)
+            for filename in docker_compose_files_list(dir, version)
+        ]
+    )
+
+
+def get_docker_compose_data_for_rev(git_dir, rev, version="git", context=None):
+    """Return docker-compose data from all the YML files in the given revision.
+    See get_docker_compose_data_from_json_list.
+
+    The result is cached in the context and on disk, keyed by the tree SHA of
+    the revision. Git trees are immutable, so the cache never needs to be
+    invalidated. The returned data is shared, and must not be modified."""
+
+    if context is None:
+        context = CONTEXT
+    reader = git_object_reader(git_dir, context)
+    tree = reader.read("%s^{tree}" % rev)
+    if tree is None:
+        raise GitObjectMissingException(
+            "Revision '%s' not found in %s" % (rev, git_dir)
+        )
+    (tree_sha, _, tree_content) = tree
+    cache_key = "%s-%s" % (tree_sha, version)
+    data = context.compose_data_by_tree.get(cache_key)
+    if data is not None:
+        return data
+    data = read_cache("compose-data", cache_key)
+    if data is not None:
+        context.compose_data_by_tree[cache_key] = data
+        return data
+
+    entries = {}
+    for mode, name, sha in reader.parse_tree(tree_sha, tree_content):
+        entries[name] = sha
+    yamls = []
+    for filename in filter_docker_compose_files_list(list(entries.keys()), version):
+        (_, _, content) = reader.read(entries[filename])
+        yamls.append(content.decode())
+
+    data = get_docker_compose_data_from_json_list(yamls)
+    write_cache("compose-data", cache_key, data)
+    context.compose_data_by_tree[cache_key] = data
+    return data
+
+
+def closest_ref(git_dir, context=None):
+    """Returns the short name of the tag or branch which is closest to HEAD in
+    git_dir, or an empty string if there are none. The distance of a ref is the
+    number of commits from its merge base with HEAD to HEAD, and ties are
+    broken by name. We look at tags and local branches, as well as single level
+    upstream branches (which avoids pull requests).
+
+    Instead of measuring every ref, one walk over the commits which are not in
+    HEAD finds, for each ref, the commits in HEAD's history it is based on. Only
+    refs whose bases are not all ancestors of another ref's base can be
+    closest, and only those are measured. The result is cached on disk for each
+    combination of HEAD and refs."""
+
+    git_dir = os.path.abspath(git_dir)
+    head = execute_git(
+        None, git_dir, ["rev-parse", "HEAD"], capture=True, context=context
+    )
+    output = execute_git(
+        None,
+        git_dir,
+        [
+            "for-each-ref",
+            "--format=%(objectname) %(*objectname) %(refname:short)",
+            "refs/tags/*",
+            "refs/heads/*",
+            "refs/remotes/*/*",
+        ],
+        capture=True,
+        context=context,
+    )
+    cache_key = "%s-%s" % (head, hashlib.sha1(output.encode()).hexdigest())
+    cached = read_cache("closest-ref", cache_key)
+    if cached is not None:
+        return cached
+
+    # Commit -> names of the refs pointing to it. Tags are peeled.
+    tips = {}
+    for line in output.split("\n"):
+        if line == "":
+            continue
+        (sha, peeled, name) = line.split(" ", 2)
+        tips.setdefault(peeled or sha, []).append(name)
+    if len(tips) == 0:
+        return ""
+
+    # Walk everything reachable from the refs, but not from HEAD. Children are
+    # listed before their parents, and boundary commits, which are in HEAD's
+    # history, are prefixed with "-". There can be any number of refs, so they
+    # are passed on standard input rather than as arguments.
+    output = execute_git(
+        None,
+        git_dir,
+        ["rev-list", "--topo-order", "--boundary", "--parents", "--stdin"],
+        capture=True,
+        input="\n".join(list(tips.keys()) + ["^" + head]) + "\n",
+        context=context,
+    )
+    parents = {}
+    for line in output.split("\n"):
+        if line == "" or line.startswith("-"):
+            continue
+        commits = line.split(" ")
+        parents[commits[0]] = commits[1:]
+
+    # The bases of a commit outside of HEAD's history are the commits in HEAD's
+    # history it is built on. A commit in HEAD's history is its own base.
+    bases = {}
+    for commit in reversed(list(parents.keys())):
+        commit_bases = set()
+        for parent in parents[commit]:
+            commit_bases |= bases.get(parent, {parent})
+        bases[commit] = frozenset(commit_bases)
+    tip_bases = {tip: bases.get(tip, frozenset([tip])) for tip in tips}
+
+    all_bases = set().union(*tip_bases.values())
+    independent = set(
+        execute_git(
+            None,
+            git_dir,
+            ["merge-base", "--independent"] + sorted(all_bases),
+            capture=True,
+            context=context,
+        ).split()
+    )
+
+    distances = {}
+    closest = None
+    for tip, tip_base in tip_bases.items():
+        if len(tip_base) == 1 and not tip_base & independent:
+            # The base is an ancestor of the base of another ref, which is
+            # closer.
+            continue
+        distance = distances.get(tip_base)
+        if distance is None:
+            revisions = [head] + ["^" + base for base in sorted(tip_base)]
+            distance = int(
+                execute_git(
+                    None,
+                    git_dir,
+                    ["rev-list", "--count", "--stdin"],
+                    capture=True,
+                    input="\n".join(revisions) + "\n",
+                    context=context,
+                )
+            )
+            distances[tip_base] = distance
+        for name in tips[tip]:
+            if closest is None or (distance, name) < closest:
+                closest = (distance, name)
+
+    write_cache("closest-ref", cache_key, closest[1])
+    return closest[1]
+
+
+def version_of(
+    integration_dir,
+    yml_component,
+    in_integration_version=None,
+    git_version=True,
+    context=None,
+):
+    if yml_component.yml() == "mender-client-docker-addons":
+        # Also known as "integration"
+        if in_integration_version is not None:
+            # Just return the supplied version string.
+            return in_integration_version
+        else:
+            # Return "closest" branch or tag name, and we assume that this is
+            # our current version.
+            return closest_ref(integration_dir, context)
+
+    if in_integration_version is not None:
+        # Check if there is a range, and if so, return range.
+        range_type = ""
+        rev_range = in_integration_version.split("...")
+        if len(rev_range) > 1:
+            range_type = "..."
+        else:
+            rev_range = in_integration_version.split("..")
+            if len(rev_range) > 1:
+                range_type = ".."
+
+        repo_range = []
+        for rev in rev_range:
+            # Figure out if the user string contained a remote or not
+            remote = ""
+            split = rev.split("/", 1)
+            if len(split) > 1:
+                remote_candidate = split[0]
+                ref_name = split[1]
+                reader = git_object_reader(integration_dir, context)
+                if reader.read("refs/heads/%s" % ref_name) is not None:
+                    remote = remote_candidate + "/"
+
+            if not git_version:
+                data = get_docker_compose_data_for_rev(
+                    integration_dir, rev, "docker", context
+                )
+            else:
+                data = get_docker_compose_data_for_rev(
+                    integration_dir, rev, "git", context
+                )
+                # For pre 2.4.x releases git-versions.*.yml files do not exist hence this listing
+                # would be missing the backend components. Try loading the old "docker" versions.
+                if data.get(yml_component.yml()) is None:
+                    data = get_docker_compose_data_for_rev(
+                        integration_dir, rev, "docker", context
+                    )
+            # If the repository didn't exist in that version, just return all
+            # commits in that case, IOW no lower end point range.
+            if data.get(yml_component.yml()) is not None:
+                version = data[yml_component.yml()]["version"]
+                # If it is a tag, do not prepend remote name
+                if re.search(r"^[0-9]+\.[0-9]+\.[0-9]+$", version):
+                    repo_range.append(version)
+                else:
+                    repo_range.append(remote + version)
+        return range_type.join(repo_range)
+    else:
+        if not git_version:
+            data = get_docker_compose_data(integration_dir, "docker")
+        else:
+            data = get_docker_compose_data(integration_dir, "git")
+        return data[yml_component.yml()]["version"]
+
+
+def query_version_of(service, in_integration_version, version_type):
+    """Returns the version of service, like --version-of does."""
+
+    try:
+        comp = Component.get_component_of_any_type(service)
+    except KeyError:
+        print("Unrecognized repository: %s" % service)
+        sys.exit(1)
+
+    yml_component = comp.yml_components()[0]
+
+    assert version_type in ["docker", "git"], (
+        "%s is not a valid name type!" % version_type
+    )
+
+    return version_of(
+        integration_dir(),
+        yml_component,
+        in_integration_version,
+        git_version=(version_type == "git"),
+    )
+
+
+def do_version_of(args):
+    """Process --version-of argument."""
+
+    print(
+        query_version_of(
+            args.version_of, args.in_integration_version, args.version_type
+        )
+    )
+
+
+def do_version_of_batch(args):
+    """Process --version-of-batch argument. The input is a JSON list of queries,
+    where each query is an object with the keys "service", and optionally
+    "in_integration_version" and "version_type" (default "git"), which have the
+    same meaning as the corresponding arguments of --version-of. Prints the
+    queries back as a JSON list, with the result of each added under "version".
+
+    All queries share one process, and therefore also the Git object readers
+    and the compose data of each integration revision."""
+
+    if args.version_of_batch == "-":
+        queries = json.load(sys.stdin)
+    else:
+        with open(args.version_of_batch) as fd:
+            queries = json.load(fd)
+
+    results = []
+    for query in queries:
+        result = dict(query)
+        result["version"] = query_version_of(
+            query["service"],
+            query.get("in_integration_version"),
+            query.get("version_type", "git"),
+        )
+        results.append(result)
+    print(json.dumps(results, indent=2))
+
+
+def do_list_repos(args, optional_too):
+    """Lists the repos, using the provided type."""
+
+    cli_types = {
+        "container": "docker_container",
+        "docker": "docker_image",
+        "git": "git",
+    }
+    assert args.list in cli_types.keys(), "%s is not a valid name type!" % args.list
+    type = cli_types[args.list]
+
+    repos = [
+        comp.name
+        for comp in Component.get_components_of_type(
+            type, only_release=(not optional_too)
+        )
+    ]
+
+    for repo in sorted(repos):
+        print(repo)
+
+
+# Final and beta version tags, for example "2.6.0" and "2.6.0b1".
+VERSION_TAG_REGEX = re.compile(r"^([0-9]+)\.([0-9]+)\.([0-9]+)(?:b([0-9]+))?$")
+# Build tags, for example "2.6.0-build3" or "mender-2.6.0-build3".
+BUILD_TAG_REGEX = re.compile(r"^(.+)-build([0-9]+)$")
+# Hosted Mender tags, for example "saas-v2021.05.20" and "saas-v2021.05.20.02".
+SAAS_TAG_REGEX = re.compile(r"^(saas-v[0-9]{4}\.[0-9]{2}\.[0-9]{2})(?:\.([0-9]{2}))?$")
+
+
+def version_sort_key(version):
+    """Returns a key used to compare versions. A final version sorts after all
+    the betas of the same version."""
+
+    (major, minor, patch, beta) = version_components(version)
+    if beta is None:
+        return (major, minor, patch, 1, 0)
+    else:
+        return (major, minor, patch, 0, beta)
+
+
+class TagIndex:
+    """All the tags of one repository, read with a single for-each-ref and
+    parsed once, so that version arithmetic does not need to call Git again.
+
+    Final and beta versions are kept sorted by version_sort_key(), build tags
+    are grouped by the version they are builds of, and Hosted Mender tags by
+    their date.
+
+    Use tag_index() to get the shared index for a repository. It is dropped
+    automatically whenever execute_git() runs a command which may change the
+    tags of that repository."""
+
+    def __init__(self, tags):
+        """tags is a dictionary of tag names to the SHA of each tag."""
+
+        self.tags = tags
+        versions = []
+        # version -> sorted list of (build number, tag).
+        self.builds = {}
+        # "saas-vYYYY.MM.DD" -> highest serial, where the plain tag is 1.
+        self.saas = {}
+        for tag in tags:
+            if VERSION_TAG_REGEX.match(tag) is not None:
+                versions.append((version_sort_key(tag), tag))
+                continue
+            match = BUILD_TAG_REGEX.match(tag)
+            if match is not None:
+                self.builds.setdefault(match.group(1), []).append(
+                    (int(match.group(2)), tag)
+                )
+                continue
+            match = SAAS_TAG_REGEX.match(tag)
+            if match is not None:
+                serial = int(match.group(2)) if match.group(2) is not None else 1
+                if serial > self.saas.get(match.group(1), 0):
+                    self.saas[match.group(1)] = serial
+
+        versions.sort()
+        self.version_keys = [key for key, _ in versions]
+        self.version_tags = [tag for _, tag in versions]
+        for builds in self.builds.values():
+            builds.sort()
+
+    @staticmethod
+    def from_repository(work_tree, context=None):
+        if context is None:
+            context = CONTEXT
+        output = context.git_runner.run(
+            work_tree,
+            ["for-each-ref", "--format=%(refname) %(objectname)", "refs/tags"],
+            capture=True,
+        )
+        tags = {}
+        for line in output.split("\n"):
+            if line == "":
+                continue
+            (refname, sha) = line.split(" ", 1)
+            tags[refname[len("refs/tags/") :]] = sha
+        return TagIndex(tags)
+
+    def has(self, tag):
+        """Returns True if the tag exists."""
+        return tag in self.tags
+
+    def final_versions(self):
+        """Returns all final and beta version tags, highest first."""
+        return list(reversed(self.version_tags))
+
+    def prev_version(self, version):
+        """Returns the highest version tag which is less than version, or None if
+        there is none, or version is not a version at all (for example for
+        internal releases with special tags)."""
+
+        try:
+            key = version_sort_key(version)
+        except NotAVersionException:
+            return None
+        index = bisect.bisect_left(self.version_keys, key)
+        if index == 0:
+            return None
+        return self.version_tags[index - 1]
+
+    def next_version(self, version):
+        """Returns the lowest version tag which is greater than version, or None
+        if there is none."""
+
+        try:
+            key = version_sort_key(version)
+        except NotAVersionException:
+            return None
+        index = bisect.bisect_right(self.version_keys, key)
+        if index == len(self.version_tags):
+            return None
+        return self.version_tags[index]
+
+    def build_tags(self, version):
+        """Returns all <version>-buildX tags, lowest build first."""
+        return [tag for _, tag in self.builds.get(version, [])]
+
+    def highest_build(self, version):
+        """Returns a (build number, tag) tuple for the highest <version>-buildX
+        tag, or None if there are no build tags for version."""
+
+        builds = self.builds.get(version)
+        if not builds:
+            return None
+        return builds[-1]
+
+    def highest_saas_serial(self, saas_version):
+        """Returns the highest serial of the Hosted Mender tags for the
+        "saas-vYYYY.MM.DD" date, where the tag without a serial counts as 1, or
+        0 if there are no tags for that date."""
+
+        return self.saas.get(saas_version, 0)
+
+
+def git_work_tree(state, repo_git):
+    """Returns the absolute path to repo_git. state can be None if repo_git is
+    already an absolute path."""
+
+    if os.path.isabs(repo_git):
+        return repo_git
+    else:
+        return os.path.join(state["repo_dir"], repo_git)
+
+
+def tag_index(state, repo_git, context=None):
+    """Returns the TagIndex of the repository, building it on first use. The
+    index is kept in the context."""
+
+    if context is None:
+        context = CONTEXT
+    work_tree = git_work_tree(state, repo_git)
+    with context.tag_indexes_lock:
+        index = context.tag_indexes.get(work_tree)
+    if index is None:
+        index = TagIndex.from_repository(work_tree, context)
+        with context.tag_indexes_lock:
+            context.tag_indexes[work_tree] = index
+    return index
+
+
+def forget_tag_index(work_tree, context=None):
+    """Drops the TagIndex of the repository in work_tree, if any."""
+
+    if context is None:
+        context = CONTEXT
+    with context.tag_indexes_lock:
+        context.tag_indexes.pop(work_tree, None)
+
+
+def sorted_final_version_list(git_dir, context=None):
+    """Returns a sorted list of all final version tags, highest first."""
+
+    return tag_index(None, git_dir, context).final_versions()
+
+
+def state_value(state, key_list):
+    """Gets a value from the state variable stored in the state file yaml file.
+    The key_list is a list of indexes, where each element represents a subkey of
+    the previous key.
+
+    The difference between this function and simply indexing 'state' directly is
+    that if any subkey is not found, including parent keys, None is returned
+    instead of exception.
+    """
+
+    try:
+        next = state
+        for key in key_list:
+            next = next[key]
+        return next
+    except KeyError:
+        return None
+
+
+def update_state(state, key_list, value, context=None):
+    """Updates the state variable and writes this to the state file of the
+    context. key_list is the same value as the state_value function.
+
+    Inside a state_transaction(), the write is postponed until the outermost
+    transaction ends. With context.state_journal, the change is appended to the
+    journal instead of rewriting the whole file, see save_state()."""
+
+    if context is None:
+        context = CONTEXT
+    next = state
+    prev = state
+    for key in key_list:
+        prev = next
+        if next.get(key) is None:
+            next[key] = {}
+        next = next[key]
+    prev[key_list[-1]] = value
+
+    if context.state_transaction_depth > 0:
+        context.state_dirty = True
+    elif (
+        context.state_journal
+        and context.state_journal_base is state
+        and context.state_journal_entries < STATE_JOURNAL_MAX_ENTRIES
+    ):
+        append_state_journal(key_list, value, context)
+    else:
+        save_state(state, context)
+
+
+# How many changes the journal of the state file may hold before it is folded
+# into the state file.
+STATE_JOURNAL_MAX_ENTRIES = 100
+
+
+def state_journal_file(context=None):
+    if context is None:
+        context = CONTEXT
+    return context.state_file + ".journal"
+
+
+def save_state(state, context=None):
+    """Writes the whole state to the state file of the context, and removes the
+    journal, which the state file now includes. The file is replaced
+    atomically, so a crash never leaves a partially written state file behind.
+    If the state file is a symlink, its target is replaced, and the file keeps
+    its mode."""
+
+    if context is None:
+        context = CONTEXT
+    # Replace the file the state file points to, not the symlink itself.
+    state_file = os.path.realpath(context.state_file)
+    if os.path.exists(state_file):
+        mode = os.stat(state_file).st_mode & 0o7777
+    else:
+        # The mode open() would have created the file with.
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    tmp_fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(state_file),
+        prefix=os.path.basename(state_file),
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(tmp_fd, "w") as fd:
+            fd.write(dump_yaml(state))
+        # mkstemp() creates the file readable by the owner only.
+        os.chmod(tmp, mode)
+        os.replace(tmp, state_file)
+    except:
+        os.remove(tmp)
+        raise
+    journal_file = state_journal_file(context)
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
+
+    context.state_dirty = False
+    context.state_journal_base = state
+    context.state_journal_entries = 0
+
+
+def append_state_journal(key_list, value, context=None):
+    """Records a single update_state() call in the journal of the state file."""
+
+    if context is None:
+        context = CONTEXT
+    with open(state_journal_file(context), "a") as fd:
+        fd.write(json.dumps({"keys": key_list, "value": value}) + "\n")
+    context.state_journal_entries += 1
+
+
+def load_state(state_file, context=None):
+    """Reads the state from state_file, including any changes in its journal, and
+    makes it the state file of the context. If there was a journal, it is
+    folded into the state file. Returns an empty state if the file does not
+    exist."""
+
+    if context is None:
+        context = CONTEXT
+    context.state_file = state_file
+    if not os.path.exists(state_file):
+        return {}
+
+    with open(state_file) as fd:
+        state = load_yaml(fd) or {}
+    journal_file = state_journal_file(context)
+    if os.path.exists(journal_file):
+        with open(journal_file) as fd:
+            for line in fd:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A partially written last entry, from a crash.
+                    break
+                next = state
+                for key in entry["keys"][:-1]:
+                    if next.get(key) is None:
+                        next[key] = {}
+                    next = next[key]
+                next[entry["keys"][-1]] = entry["value"]
+        save_state(state, context)
+    return state
+
+
+def flush_state_journal(context=None):
+    """Folds the journal into the state file, so that the state file is complete
+    whenever the release tool is not running. This is done for every context
+    when the process exits."""
+
+    if context is None:
+        context = CONTEXT
+    if context.state_journal_entries > 0:
+        save_state(context.state_journal_base, context)
+
+
+@contextlib.contextmanager
+def state_transaction(state, context=None):
+    """Within the transaction, update_state() only changes the state in memory,
+    and the state file is written once when the outermost transaction ends."""
+
+    if context is None:
+        context = CONTEXT
+    context.state_transaction_depth += 1
+    try:
+        yield
+    finally:
+        context.state_transaction_depth -= 1
+        if context.state_transaction_depth == 0 and context.state_dirty:
+            save_state(state, context)
+
+
+class GitRunner:
+    """Runs Git commands in repositories. Each command gets the repository
+    through cwd and an explicit GIT_DIR, never by changing the working
+    directory of the process, so a runner can be used from many threads at
+    once. Commands are recorded with trace().
+
+    Whether commands with side effects really run is decided by the push and
+    dry_run settings of the ReleaseToolContext given to the runner. Use the
+    runner of a context, usually through execute_git()."""
+
+    def __init__(self, context):
+        self.context = context
+        self.lock = threading.Lock()
+        self.git_dirs = {}
+
+    @staticmethod
+    def is_change(args):
+        """Returns True if the command may change the repository."""
+
+        return (
+            args[0] == "push"
+            or (args[0] == "tag" and len(args) > 1)
+            or (args[0] == "branch" and len(args) > 1)
+            or (args[0] == "config" and args[1] != "-l")
+            or (args[0] == "checkout")
+            or (args[0] == "commit")
+            or (args[0] == "fetch")
+            or (args[0] == "init")
+            or (args[0] == "reset")
+        )
+
+    def is_simulated(self, args):
+        """Returns True if the command has side effects which push simulation or
+        dry-run says should not really happen."""
+
+        is_push = args[0] == "push"
+        return (not self.context.push and is_push) or (
+            self.context.dry_run and GitRunner.is_change(args)
+        )
+
+    def git_dir(self, work_tree):
+        """Returns the absolute Git directory of the repository in work_tree, or
+        None if work_tree is not (yet) a Git repository."""
+
+        with self.lock:
+            git_dir = self.git_dirs.get(work_tree)
+        if git_dir is not None:
+            return git_dir
+
+        with self.context.trace("git", "git rev-parse", repo=work_tree) as details:
+            proc = subprocess.run(
+                ["git", "rev-parse", "--absolute-git-dir"],
+                cwd=work_tree,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            details["exit_status"] = proc.returncode
+        if proc.returncode != 0:
+            return None
+        git_dir = proc.stdout.decode().strip()
+        with self.lock:
+            self.git_dirs[work_tree] = git_dir
+        return git_dir
+
+    def environment(self, work_tree):
+        """Returns the environment Git commands in work_tree should run with."""
+
+        env = dict(os.environ)
+        git_dir = self.git_dir(work_tree)
+        if git_dir is not None:
+            env["GIT_DIR"] = git_dir
+        return env
+
+    def run(self, work_tree, args, capture=False, capture_stderr=False, input=None):
+        """Runs git with args in work_tree, which must be an absolute path. See
+        execute_git() for the meaning of the remaining arguments."""
+
+        if self.is_simulated(args):
+            print("Would have executed: cd %s && git %s" % (work_tree, " ".join(args)))
+            return None
+
+        if args[0] == "init":
+            # There is no Git directory to point to yet.
+            env = None
+        else:
+            env = self.environment(work_tree)
+
+        if capture:
+            stdout = subprocess.PIPE
+        else:
+            stdout = None
+        if capture_stderr:
+            stderr = subprocess.STDOUT
+        else:
+            stderr = None
+
+        with self.context.trace(
+            "git", "git %s" % args[0], repo=work_tree, command=" ".join(args)
+        ) as details:
+            proc = subprocess.run(
+                ["git"] + args,
+                cwd=work_tree,
+                env=env,
+                input=input.encode() if input is not None else None,
+                stdout=stdout,
+                stderr=stderr,
+            )
+            details["exit_status"] = proc.returncode
+
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(
+                proc.returncode, ["git"] + args, output=proc.stdout
+            )
+        if capture:
+            return proc.stdout.decode().strip()
+        return None
+
+
+class Tracer:
+    """Records how long external operations, such as Git, Docker and HTTP calls,
+    take, for --trace. Operations are recorded with span(), and write() saves
+    them in the Chrome trace event format, which can be opened in
+    chrome://tracing or https://ui.perfetto.dev."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.origin = time.monotonic()
+        self.events = []
+
+    @contextlib.contextmanager
+    def span(self, category, name, **args):
+        """Records the time spent in the with block as an operation called name.
+        args are stored with it, and the block can add more, such as the exit
+        status, to the dictionary that is returned."""
+
+        start = time.monotonic()
+        try:
+            yield args
+        except subprocess.CalledProcessError as err:
+            args.setdefault("exit_status", err.returncode)
+            raise
+        except BaseException as err:
+            args.setdefault("error", err.__class__.__name__)
+            raise
+        finally:
+            end = time.monotonic()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": int((start - self.origin) * 1000000),
+                "dur": int((end - start) * 1000000),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+            with self.lock:
+                self.events.append(event)
+
+    def write(self, filename):
+        """Saves all operations, plus one covering the whole run, to filename."""
+
+        with self.lock:
+            events = list(self.events)
+        events.insert(
+            0,
+            {
+                "name": "release_tool",
+                "cat": "main",
+                "ph": "X",
+                "ts": 0,
+                "dur": int((time.monotonic() - self.origin) * 1000000),
+                "pid": os.getpid(),
+                "tid": threading.main_thread().ident,
+                "args": {"argv": sys.argv},
+            },
+        )
+        with open(filename, "w") as fd:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fd)
+
+    def summary(self, top=20):
+        """Returns a table of the `top` operations that took the most time in
+        total, as a string."""
+
+        totals = {}
+        with self.lock:
+            for event in self.events:
+                entry = totals.setdefault(event["name"], [0, 0, 0])
+                entry[0] += 1
+                entry[1] += event["dur"]
+                entry[2] = max(entry[2], event["dur"])
+
+        fmt_str = "%-40s %7s %10s %10s"
+        lines = [fmt_str % ("OPERATION", "COUNT", "TOTAL", "SLOWEST")]
+        for name, (count, total, slowest) in sorted(
+            totals.items(), key=lambda item: item[1][1], reverse=True
+        )[:top]:
+            lines.append(
+                fmt_str
+                % (name, count, "%.3fs" % (total / 1e6), "%.3fs" % (slowest / 1e6))
+            )
+        return "\n".join(lines)
+
+
+# Every ReleaseToolContext, so that their Git object readers can be dropped
+# after a fork, and their state journals flushed at exit.
+CONTEXTS = weakref.WeakSet()
+
+
+class ReleaseToolContext:
+    """Settings and caches of a release_tool run, for code that uses
+    release_tool as a library. Functions that depend on them take an optional
+    context argument, and use the CONTEXT instance, which main() fills in from
+    the command line, when it is not given. Separate contexts don't share any
+    caches or state, so one process can work with several of them."""
+
+    def __init__(self, push=True, dry_run=False, use_gitlab=True, jobs=DEFAULT_JOBS):
+        # Whether or not pushes should really happen.
+        self.push = push
+        # Whether this is a dry-run.
+        self.dry_run = dry_run
+        # Whether we are using GitLab, as opposed to Jenkins.
+        self.use_gitlab = use_gitlab
+        # Whether documents fetched over HTTP are only read from the on-disk
+        # cache. See http_get_cached().
+        self.offline = False
+        # How many commands to run at the same time, in operations that support
+        # it.
+        self.jobs = jobs
+        # Whether Git pushes, which may ask for credentials on the terminal, are
+        # also run concurrently. Only if --jobs is given explicitly.
+        self.concurrent_pushes = False
+        # This is basically a YAML file which contains the state of the release
+        # tool. The easiest way to understand its format is by just looking at
+        # it after the key fields have been filled in. This is updated
+        # continuously while the script is operating. The repositories are
+        # indexed by their Git repository names.
+        self.state_file = None
+        # Whether changes to the state file are appended to a journal next to
+        # it, instead of rewriting the whole file. See update_state().
+        self.state_journal = False
+        # Bookkeeping of update_state() and friends.
+        self.state_transaction_depth = 0
+        self.state_dirty = False
+        self.state_journal_base = None
+        self.state_journal_entries = 0
+        self.git_runner = GitRunner(self)
+        # A Tracer if operations should be recorded, see trace().
+        self.tracer = None
+        # Caches, which are kept for the rest of the run. See tag_index(),
+        # git_object_reader(), find_upstream_remote(),
+        # get_docker_compose_data_for_rev(), get_release_components_for_rev()
+        # and get_extra_buildparams().
+        self.tag_indexes = {}
+        self.tag_indexes_lock = threading.Lock()
+        self.git_object_readers = {}
+        self.git_object_readers_lock = threading.Lock()
+        self.upstream_remotes = {}
+        self.upstream_remotes_lock = threading.Lock()
+        self.compose_data_by_tree = {}
+        self.release_components_by_sha = {}
+        self.extra_buildparams = None
+        # Credentials, read when they are first needed. See
+        # init_jenkins_creds() and init_gitlab_creds().
+        self.jenkins_user = None
+        self.jenkins_password = None
+        self.gitlab_token = None
+        CONTEXTS.add(self)
+
+    def trace(self, category, name, **args):
+        """Returns a context manager which records the with block as an
+        operation if tracing is enabled, see Tracer.span(). Otherwise it does
+        nothing, but still returns a dictionary the block can add details
+        to."""
+
+        if self.tracer is None:
+            return contextlib.nullcontext(args)
+        return self.tracer.span(category, name, **args)
+
+
+CONTEXT = ReleaseToolContext()
+
+
+def trace(category, name, **args):
+    """Records the with block in CONTEXT, see ReleaseToolContext.trace()."""
+
+    return CONTEXT.trace(category, name, **args)
+
+
+def execute_git(
+    state,
+    repo_git,
+    args,
+    capture=False,
+    capture_stderr=False,
+    input=None,
+    context=None,
+):
+    """Executes a Git command in the given repository, with args being a list
+    of arguments (not including git itself). capture and capture_stderr
+    arguments causes it to return stdout or stdout+stderr as a string. input is
+    an optional string to write to the standard input of the command, for
+    example the revisions of "rev-list --stdin", which, unlike arguments, has no
+    size limit.
+
+    state can be None, but if so, then repo_git needs to be an absolute path.
+
+    The function automatically takes into account Git commands with side effects
+    and applies push simulation and dry run if those are enabled in the context.
+    It is safe to call from several threads at once."""
+
+    if context is None:
+        context = CONTEXT
+    work_tree = git_work_tree(state, repo_git)
+    try:
+        return context.git_runner.run(
+            work_tree, args, capture, capture_stderr, input=input
+        )
+    finally:
+        if GitRunner.is_change(args):
+            forget_tag_index(work_tree, context)
+
+
+class GitObjectReader:
+    """Reads objects from a Git repository through one long-lived
+    'git cat-file --batch' process, so that any number of lookups only costs a
+    single process spawn. Objects are named like on the Git command line, for
+    example "HEAD^{tree}" or "2.6.0:docker-compose.yml".
+
+    Use git_object_reader() to get the shared reader for a repository."""
+
+    def __init__(self, git_dir, context=None):
+        if context is None:
+            context = CONTEXT
+        self.git_dir = git_dir
+        self.context = context
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def read(self, name):
+        """Returns a (sha, type, content) triplet for the given object, where
+        content is bytes, or None if the object does not exist."""
+
+        with self.lock, self.context.trace(
+            "git", "git cat-file", repo=self.git_dir, object=name
+        ):
+            if self.proc is None:
+                self.proc = subprocess.Popen(
+                    ["git", "cat-file", "--batch"],
+                    cwd=self.git_dir,
+                    env=self.context.git_runner.environment(self.git_dir),
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                )
+            self.proc.stdin.write(name.encode() + b"\n")
+            self.proc.stdin.flush()
+            header = self.proc.stdout.readline()
+            if not header:
+                self.close()
+                raise Exception("git cat-file exited unexpectedly in %s" % self.git_dir)
+
+            # Either "<sha> <type> <size>", or "<name> missing" (or
+            # "ambiguous") if the object doesn't exist.
+            fields = header.split()
+            if fields[-1] in [b"missing", b"ambiguous"]:
+                return None
+            (sha, type, size) = fields
+            content = self.proc.stdout.read(int(size))
+            # Skip the LF that terminates each object.
+            self.proc.stdout.read(1)
+            return (sha.decode(), type.decode(), content)
+
+    def read_file(self, rev, path):
+        """Returns the content of path in the given revision as a string, or None
+        if it doesn't exist."""
+
+        obj = self.read("%s:%s" % (rev, path))
+        if obj is None:
+            return None
+        return obj[2].decode()
+
+    @staticmethod
+    def parse_tree(tree_sha, content):
+        """Parses the raw content of a tree object, as returned by read(), and
+        returns a list of (mode, name, sha) triplets."""
+
+        # Binary SHAs are half the length of the hex one, this takes care of
+        # both SHA-1 and SHA-256 repositories.
+        sha_len = len(tree_sha) // 2
+        entries = []
+        pos = 0
+        while pos < len(content):
+            space = content.index(b" ", pos)
+            nul = content.index(b"\0", space)
+            entries.append(
+                (
+                    content[pos:space].decode(),
+                    content[space + 1 : nul].decode(),
+                    content[nul + 1 : nul + 1 + sha_len].hex(),
+                )
+            )
+            pos = nul + 1 + sha_len
+        return entries
+
+    def close(self):
+        if self.proc is not None:
+            self.proc.stdin.close()
+            self.proc.wait()
+            self.proc.stdout.close()
+            self.proc = None
+
+
+def git_object_reader(git_dir, context=None):
+    """Returns the GitObjectReader for the given repository, which is shared by
+    everything using the same context."""
+
+    if context is None:
+        context = CONTEXT
+    git_dir = os.path.realpath(git_dir)
+    with context.git_object_readers_lock:
+        reader = context.git_object_readers.get(git_dir)
+        if reader is None:
+            reader = GitObjectReader(git_dir, context)
+            context.git_object_readers[git_dir] = reader
+    return reader
+
+
+def forget_git_object_readers():
+    """Called in child processes after a fork. The readers' pipes belong to the
+    parent, so the child must start its own instead of sharing them."""
+
+    for context in list(CONTEXTS):
+        context.git_object_readers_lock = threading.Lock()
+        context.git_object_readers.clear()
+
+
+os.register_at_fork(after_in_child=forget_git_object_readers)
+
+
+@atexit.register
+def close_contexts():
+    """Flushes the state journals and closes the Git object readers of all
+    contexts when the process exits."""
+
+    for context in list(CONTEXTS):
+        flush_state_journal(context)
+        with context.git_object_readers_lock:
+            for reader in context.git_object_readers.values():
+                reader.close()
+            context.git_object_readers.clear()
+
+
+def execute_concurrently(tasks, retries=0):
+    """Runs tasks concurrently, up to CONTEXT.jobs at a time. tasks is a list of
+    (label, function) pairs. See execute_chains_concurrently() for details."""
+
+    execute_chains_concurrently([[task] for task in tasks], retries=retries)
+
+
+def map_concurrently(function, items):
+    """Returns [function(item) for item in items], but calls function
+    concurrently, up to CONTEXT.jobs at a time. Unlike execute_concurrently(),
+    nothing is printed, and the first exception, if any, is raised as is."""
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, CONTEXT.jobs)
+    ) as executor:
+        return list(executor.map(function, items))
+
+
+def execute_chains_concurrently(chains, retries=0):
+    """Runs chains of tasks concurrently, up to CONTEXT.jobs chains at a time.
+    Each chain is a list of (label, function) pairs, which are run in order, and
+    if one of them fails for good, the rest of the chain is skipped. Different
+    chains are independent of each other.
+
+    A function which raises subprocess.CalledProcessError is retried up to
+    `retries` times, waiting RETRY_DELAY seconds before the first retry, and
+    doubling the delay for each following one. Progress is printed as tasks
+    finish, followed by a timing summary. If any task failed for good, the first
+    error is raised after all chains have finished."""
+
+    print_lock = threading.Lock()
+    finished = 0
+    total_tasks = sum([len(chain) for chain in chains])
+
+    def run(label, function):
+        nonlocal finished
+        start = time.monotonic()
+        attempt = 0
+        error = None
+        while True:
+            attempt += 1
+            try:
+                function()
+                error = None
+                break
+            except subprocess.CalledProcessError as err:
+                error = err
+                if attempt > retries:
+                    break
+                delay = RETRY_DELAY * 2 ** (attempt - 1)
+                with print_lock:
+                    print(
+                        "%s: failed (attempt %d of %d), retrying in %gs..."
+                        % (label, attempt, retries + 1, delay)
+                    )
+                time.sleep(delay)
+        duration = time.monotonic() - start
+
+        with print_lock:
+            finished += 1
+            progress = "[%*d/%d]" % (len(str(total_tasks)), finished, total_tasks)
+            if error is None:
+                print("%s %s: done in %.1fs" % (progress, label, duration))
+            else:
+                print("%s %s: FAILED after %.1fs" % (progress, label, duration))
+                if error.output:
+                    if isinstance(error.output, bytes):
+                        print(error.output.decode(errors="replace").rstrip())
+                    else:
+                        print(error.output.rstrip())
+        return (label, duration, attempt, error)
+
+    def run_chain(chain):
+        results = []
+        for label, function in chain:
+            if results and results[-1][3] is not None:
+                # A previous step failed, so this one is not run.
+                results.append((label, 0.0, 0, None))
+                continue
+            results.append(run(label, function))
+        return results
+
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, CONTEXT.jobs)
+    ) as executor:
+        results = [
+            result
+            for chain_results in executor.map(run_chain, chains)
+            for result in chain_results
+        ]
+    total = time.monotonic() - start
+
+    print()
+    fmt_str = "%-40s %10s %9s %s"
+    print(fmt_str % ("TASK", "TIME", "ATTEMPTS", "RESULT"))
+    for label, duration, attempts, error in sorted(
+        results, key=lambda result: result[1], reverse=True
+    ):
+        if attempts == 0:
+            outcome = "skipped"
+        elif error is None:
+            outcome = "ok"
+        else:
+            outcome = "FAILED"
+        print(fmt_str % (label, "%.1fs" % duration, attempts, outcome))
+    print(
+        "%d tasks finished in %.1fs using %d jobs (%.1fs if run one at a time)."
+        % (len(results), total, CONTEXT.jobs, sum([result[1] for result in results]))
+    )
+
+    for _, _, _, error in results:
+        if error is not None:
+            raise error
+
+
+def query_execute_git_list(
+    execute_git_list,
+    concurrent=False,
+    retries=0,
+    then_concurrently=None,
+    then_retries=0,
+):
+    """Executes a list of Git commands after asking permission. The argument is
+    a list of triplets with the first three arguments of execute_git. Both
+    capture flags will be false during this call.
+
+    If concurrent is True, only commands in the same repository depend on each
+    other. Each repository's commands are run in order, while different
+    repositories are handled concurrently with execute_chains_concurrently(). In
+    that case the output is captured, and only shown for commands that fail.
+    Failing commands are retried `retries` times.
+
+    The commands in then_concurrently are confirmed together with the others,
+    but only run once all of those have succeeded, and then concurrently, as
+    described above, with failing commands retried `then_retries` times."""
+
+    def run_concurrently(git_list, retries):
+        chains = {}
+        for cmd in git_list:
+            chains.setdefault(cmd[1], []).append(
+                (
+                    "%s (%s)" % (os.path.basename(cmd[1]), cmd[2][0]),
+                    lambda cmd=cmd: execute_git(
+                        cmd[0], cmd[1], cmd[2], capture=True, capture_stderr=True
+                    ),
+                )
+            )
+        execute_chains_concurrently(list(chains.values()), retries=retries)
+
+    if then_concurrently is None:
+        then_concurrently = []
+
+    print_line()
+    for cmd in execute_git_list + then_concurrently:
+        # Provide quotes around arguments with spaces in them.
+        print(
+            "cd %s && git %s"
+            % (
+                cmd[1],
+                " ".join(
+                    ['"%s"' % str if str.find(" ") >= 0 else str for str in cmd[2]]
+                ),
+            )
+        )
+    reply = ask("\nOk to execute the above commands? ")
+    if not reply.startswith("Y") and not reply.startswith("y"):
+        return False
+
+    if concurrent:
+        run_concurrently(execute_git_list, retries)
+    else:
+        for cmd in execute_git_list:
+            execute_git(cmd[0], cmd[1], cmd[2])
+
+    if then_concurrently:
+        run_concurrently(then_concurrently, then_retries)
+
+    return True
+
+
+def execute_command(cmd, capture=False):
+    """Executes a command from a query_execute_list() list, unless it is a
+    Docker command with side effects that push simulation or dry run should
+    skip. If capture is True, the output is captured instead of shown, and is
+    attached to the exception if the command fails."""
+
+    is_push = cmd[0] == "docker" and cmd[1] == "push"
+    is_change = is_push or (cmd[0] == "docker" and cmd[1] == "tag")
+    if (not CONTEXT.push and is_push) or (CONTEXT.dry_run and is_change):
+        print("Would have executed: %s" % " ".join(cmd))
+        return
+
+    with trace(cmd[0], " ".join(cmd[0:2]), command=" ".join(cmd)) as details:
+        if capture:
+            subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+        else:
+            subprocess.check_call(cmd)
+        details["exit_status"] = 0
+
+
+def docker_image_repository(cmd):
+    """Returns the image, without the tag, that a "docker pull", "docker tag" or
+    "docker push" command works on, or None for other commands."""
+
+    if cmd[0] != "docker" or cmd[1] not in ["pull", "tag", "push"]:
+        return None
+    image, _, tag = cmd[-1].rpartition(":")
+    if not image or "/" in tag:
+        # No tag, the colon belongs to a registry port.
+        return cmd[-1]
+    return image
+
+
+def query_execute_list(execute_list, concurrent=False, retries=0):
+    """Executes the list of commands after asking first. The argument is a list of
+    lists, where the inner list is the argument to subprocess.check_call.
+
+    The function automatically takes into account Docker commands with side
+    effects and applies push simulation and dry run if those are enabled.
+
+    If concurrent is True, only Docker commands working on the same image depend
+    on each other. Each image's commands are run in order, while different
+    images, and any other commands, are handled concurrently with
+    execute_chains_concurrently(). In that case the output is captured, and only
+    shown for commands that fail. Failing commands are retried `retries` times.
+    """
+
+    print_line()
+    for cmd in execute_list:
+        # Provide quotes around arguments with spaces in them.
+        print(" ".join(['"%s"' % str if str.find(" ") >= 0 else str for str in cmd]))
+    reply = ask("\nOk to execute the above commands? ")
+    if not reply.startswith("Y") and not reply.startswith("y"):
+        return False
+
+    if concurrent:
+        chains = {}
+        for index, cmd in enumerate(execute_list):
+            key = docker_image_repository(cmd) or index
+            chains.setdefault(key, []).append(
+                (
+                    " ".join(cmd[0:2] + [cmd[-1]]),
+                    lambda cmd=cmd: execute_command(cmd, capture=True),
+                )
+            )
+        execute_chains_concurrently(list(chains.values()), retries=retries)
+        return True
+
+    for cmd in execute_list:
+        execute_command(cmd)
+
+    return True
+
+
+def setup_temp_git_checkout(state, repo_git, ref):
+    """Checks out a temporary Git directory, and returns an absolute path to
+    it. Checks out the ref specified in ref.
+
+    The checkout borrows the objects of the original repository through
+    objects/info/alternates, so fetching from it only copies refs. Unlike
+    'git worktree add', this keeps branches and tags created in the checkout
+    out of the original repository. Objects created in the checkout are stored
+    in the checkout itself."""
+
+    tmpdir = os.path.join(state["repo_dir"], "tmp_checkout", repo_git)
+    cleanup_temp_git_checkout(tmpdir)
+    os.makedirs(tmpdir)
+
+    if not os.path.exists(os.path.join(state["repo_dir"], repo_git)):
+        raise Exception("%s does not exist in %s!" % (repo_git, state["repo_dir"]))
+
+    if ref.find("/") < 0:
+        # Local branch.
+        checkout_cmd = ["checkout"]
+    else:
+        # Remote branch.
+        checkout_cmd = ["checkout", "-t"]
+
+    try:
+        output = execute_git(state, tmpdir, ["init"], capture=True, capture_stderr=True)
+        tmp_git_dir = CONTEXT.git_runner.git_dir(tmpdir)
+        # In dry-run mode the init above did not happen, and tmpdir is either
+        # not a repository, or inside some other repository, which must not be
+        # touched.
+        if tmp_git_dir == os.path.realpath(os.path.join(tmpdir, ".git")):
+            objects = execute_git(
+                state, repo_git, ["rev-parse", "--git-path", "objects"], capture=True
+            )
+            objects = os.path.join(state["repo_dir"], repo_git, objects)
+            with open(
+                os.path.join(tmp_git_dir, "objects", "info", "alternates"), "w"
+            ) as fd:
+                fd.write(os.path.realpath(objects) + "\n")
+        output = execute_git(
+            state,
+            tmpdir,
+            ["fetch", os.path.join(state["repo_dir"], repo_git), "--tags"],
+            capture=True,
+            capture_stderr=True,
+        )
+        output = execute_git(
+            state,
+            tmpdir,
+            ["checkout", "FETCH_HEAD~0"],
+            capture=True,
+            capture_stderr=True,
+        )
+        output = execute_git(state, tmpdir, ["tag"], capture=True)
+        tags = output.split("\n")
+        output = execute_git(state, tmpdir, ["branch"], capture=True)
+        branches = output.split("\n")
+        if ref not in tags and ref not in branches:
+            # Try to mirror all branches locally instead of just as remote branches.
+            output = execute_git(
+                state,
+                tmpdir,
+                [
+                    "fetch",
+                    os.path.join(state["repo_dir"], repo_git),
+                    "--tags",
+                    "%s:%s" % (ref, ref),
+                ],
+                capture=True,
+                capture_stderr=True,
+            )
+        output = execute_git(
+            state, tmpdir, checkout_cmd + [ref], capture=True, capture_stderr=True
+        )
+    except:
+        print("Output from previous Git command: %s" % output)
+        raise
+
+    return tmpdir
+
+
+def cleanup_temp_git_checkout(tmpdir):
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def find_upstream_remote(state, repo_path, repo_name=None, context=None):
+    """Given a Git repository, figure out which remote name is the
+    "mendersoftware" upstream.
+
+    With repo_name None (default), the name is taken from basename(repo_path)
+
+    The answer is remembered for each repository in the context.
+    """
+
+    if context is None:
+        context = CONTEXT
+    if repo_name is None:
+        repo_name = os.path.basename(repo_path)
+
+    key = (os.path.realpath(git_work_tree(state, repo_path)), repo_name)
+    with context.upstream_remotes_lock:
+        remote = context.upstream_remotes.get(key)
+    if remote is not None:
+        return remote
+
+    config = execute_git(
+        state, repo_path, ["config", "-l"], capture=True, context=context
+    )
+    remote = None
+    for line in config.split("\n"):
+        match = re.match(
+            r"^remote\.([^.]+)\.url=.*github\.com[/:]mendersoftware/%s(\.git)?$"
+            % repo_name,
+            line,
+        )
+        if match is not None:
+            remote = match.group(1)
+            break
+
+    if remote is None:
+        raise Exception(
+            "Could not find git remote pointing to mendersoftware in repo %s at %s"
+            % (repo_name, repo_path)
+        )
+
+    with context.upstream_remotes_lock:
+        context.upstream_remotes[key] = remote
+    return remote
+
+
+def refresh_repos(state):
+    """Do a full 'git fetch' on all repositories."""
+
+    git_list = []
+
+    for repo in Component.get_components_of_type("git"):
+        remote = find_upstream_remote(state, repo.git())
+        git_list.append(
+            (
+                state,
+                repo.git(),
+                ["fetch", "--tags", remote, "+refs/heads/*:refs/remotes/%s/*" % remote],
+            )
+        )
+
+    # The fetches are independent network operations, so run them concurrently,
+    # and retry the ones that fail.
+    query_execute_git_list(git_list, concurrent=True, retries=RETRIES)
+
+
+def check_tag_availability(state):
+    """Check which tags are available in all the Git repositories, and return
+    this as the tag_avail data structure.
+
+    The main fields in this one are:
+      image_tag: <highest Docker tag, or final Docker tag (i.e. mender-X.Y.Z)>
+      <repo>:
+        already_released: <whether this is a final release tag or not (true/false)>
+        build_tag: <highest Git build tag, or final Git tag>
+        following: <branch we pick next build tag from>
+        sha: <SHA of current build tag>
+    """
+
+    tag_avail = {}
+    highest_overall = -1
+    all_released = True
+    for repo in Component.get_components_of_type("git"):
+        tag_avail[repo.git()] = {}
+        missing_repos = False
+        try:
+            tags = tag_index(state, repo.git())
+        except FileNotFoundError as err:
+            print(err)
+            missing_repos = True
+            continue
+
+        if tags.has(state[repo.git()]["version"]):
+            # This is a final release tag.
+            tag_avail[repo.git()]["already_released"] = True
+            tag_avail[repo.git()]["build_tag"] = state[repo.git()]["version"]
+        else:
+            # This tag doesn't exist, and we must look for and/or create build
+            # tags.
+            tag_avail[repo.git()]["already_released"] = False
+            all_released = False
+
+            # Find highest <version>-buildX tag, where X is a number.
+            highest = tags.highest_build(state[repo.git()]["version"])
+            if highest is not None:
+                # Assign highest tag so far.
+                tag_avail[repo.git()]["build_tag"] = highest[1]
+                if highest[0] > highest_overall:
+                    highest_overall = highest[0]
+            # Else: Nothing. This repository doesn't have any build tags yet.
+
+        if tag_avail[repo.git()].get("build_tag") is not None:
+            sha = execute_git(
+                state,
+                repo.git(),
+                ["rev-parse", "--short", tag_avail[repo.git()]["build_tag"] + "~0"],
+                capture=True,
+            )
+            tag_avail[repo.git()]["sha"] = sha
+
+    if highest_overall > 0:
+        tag_avail["image_tag"] = "mender-%s-build%d" % (
+            state["version"],
+            highest_overall,
+        )
+    elif all_released:
+        tag_avail["image_tag"] = "mender-%s" % state["version"]
+
+    if missing_repos:
+        print("Error: missing repos directories.")
+        sys.exit(2)
+
+    return tag_avail
+
+
+def repo_sort_key(repo):
+    """Used in sorted() calls to sort by Git name."""
+    return repo.name
+
+
+def report_release_state(state, tag_avail):
+    """Reports the current state of the release, including current build
+    tags."""
+
+    print("Mender release: %s" % state["version"])
+    print("Next build image: ", end="")
+    if tag_avail.get("image_tag") is not None:
+        print(tag_avail["image_tag"])
+    else:
+        print("<Needs a new image tag>")
+    fmt_str = "%-27s %-10s %-16s %-20s"
+    print(fmt_str % ("REPOSITORY", "VERSION", "PICK NEXT BUILD", "BUILD TAG"))
+    print(fmt_str % ("", "", "TAG FROM", ""))
+    for repo in sorted(Component.get_components_of_type("git"), key=repo_sort_key):
+        if tag_avail[repo.git()]["already_released"]:
+            tag = state[repo.git()]["version"]
+            # Report released tags as following themselves, even though behind
+            # the scenes we do keep track of a branch we follow. This is because
+            # released repositories don't receive build tags.
+            following = state[repo.git()]["version"]
+        else:
+            tag = tag_avail[repo.git()].get("build_tag")
+            if tag is None:
+                tag = "<Needs a new build tag>"
+            else:
+                tag = "%s (%s)" % (tag, tag_avail[repo.git()]["sha"])
+            following = state[repo.git()]["following"]
+
+        print(fmt_str % (repo.git(), state[repo.git()]["version"], following, tag))
+
+
+def annotation_version(repo, tag_avail):
+    """Generates the string used in Git tag annotations."""
+
+    match = re.match("^(.*)-build([0-9]+)$", tag_avail[repo.git()]["build_tag"])
+    if match is None:
+        return "%s version %s." % (repo.git(), tag_avail[repo.git()]["build_tag"])
+    else:
+        return "%s version %s Build %s." % (repo.git(), match.group(1), match.group(2))
+
+
+def version_components(version):
+    """Returns a four-tuple containing the version componets major, minor, patch
+    and beta, as ints. Beta does not include the "b"."""
+
+    match = re.match(r"^([0-9]+)\.([0-9]+)\.([0-9]+)(?:b([0-9]+))?", version)
+    if match is None:
+        raise NotAVersionException(
+            "Invalid version '%s' passed to version_components." % version
+        )
+
+    if match.group(4) is None:
+        return (int(match.group(1)), int(match.group(2)), int(match.group(3)), None)
+    else:
+        return (
+            int(match.group(1)),
+            int(match.group(2)),
+            int(match.group(3)),
+            int(match.group(4)),
+        )
+
+
+def find_patch_version(
+    state, repo, prev_version, next_unreleased=False, last_released=False
+):
+    """Returns a patch version in a series, either the next unreleased one, or the
+    last (most recent) released one."""
+
+    if (next_unreleased and last_released) or not (next_unreleased or last_released):
+        raise Exception(
+            "Exactly one of the next_unreleased or last_released flags must be set!"
+        )
+
+    last_version = prev_version
+    while True:
+        (major, minor, patch, beta) = version_components(last_version)
+        if beta is not None:
+            new_version = "%d.%d.%d" % (major, minor, patch)
+        else:
+            new_version = "%d.%d.%d" % (major, minor, patch + 1)
+
+        if not tag_index(state, repo.git()).has(new_version):
+            # Doesn't exist.
+            if last_released:
+                return last_version
+            else:
+                return new_version
+
+        # If it exists, loop around and try again.
+        last_version = new_version
+
+
+def generate_new_tags(state, tag_avail, final):
+    """Creates new build tags, and returns the new tags in a modified tag_avail. If
+    interrupted anywhere, it makes no change, and returns the original tag_avail
+    instead."""
+
+    output = execute_git(state, "integration", ["show", "-s"], capture=True)
+    if output.find(VERSION_BUMP_STRING) >= 0:
+        # Previous version bump detected. Roll back one commit.
+        execute_git(state, "integration", ["reset", "--hard", "HEAD~1"])
+
+    # Find highest of all build tags in all repos.
+    highest = 0
+    for repo in Component.get_components_of_type("git"):
+        if (
+            not tag_avail[repo.git()]["already_released"]
+            and tag_avail[repo.git()].get("build_tag") is not None
+        ):
+            match = re.match(".*-build([0-9]+)$", tag_avail[repo.git()]["build_tag"])
+            if match is not None and int(match.group(1)) > highest:
+                highest = int(match.group(1))
+
+    # Assign new build tags to each repo based on our previous findings.
+    next_tag_avail = copy.deepcopy(tag_avail)
+    for repo in Component.get_components_of_type("git"):
+        if not tag_avail[repo.git()]["already_released"]:
+            if final:
+                # For final tag, point to the previous build tag, not the
+                # version we follow.
+                # "~0" is used to avoid a tag pointing to another tag. It should
+                # point to the commit.
+                sha = execute_git(
+                    state,
+                    repo.git(),
+                    ["rev-parse", "--short", tag_avail[repo.git()]["build_tag"] + "~0"],
+                    capture=True,
+                )
+                # For final tag, use actual version.
+                next_tag_avail[repo.git()]["build_tag"] = state[repo.git()]["version"]
+            else:
+                # For build tag, point the next tag to the last version of the
+                # branch we follow.
+                # "~0" is used to avoid a tag pointing to another tag. It should
+                # point to the commit.
+                sha = execute_git(
+                    state,
+                    repo.git(),
+                    ["rev-parse", "--short", state[repo.git()]["following"] + "~0"],
+                    capture=True,
+                )
+                # For non-final, use next build number.
+                next_tag_avail[repo.git()]["build_tag"] = "%s-build%d" % (
+                    state[repo.git()]["version"],
+                    highest + 1,
+                )
+
+            next_tag_avail[repo.git()]["sha"] = sha
+
+            print_line()
+            if tag_avail[repo.git()].get("build_tag") is None:
+                # If there is no existing tag, just display latest commit.
+                print("The latest commit in %s will be:" % repo.git())
+                execute_git(state, repo.git(), ["log", "-n1", sha])
+            else:
+                # If there is an existing tag, display range.
+                print("The new commits in %s will be:" % repo.git())
+                execute_git(
+                    state,
+                    repo.git(),
+                    ["log", "%s..%s" % (tag_avail[repo.git()]["build_tag"], sha)],
+                )
+            print()
+
+    if final:
+        next_tag_avail["image_tag"] = "mender-" + state["version"]
+    else:
+        next_tag_avail["image_tag"] = "mender-%s-build%d" % (
+            state["version"],
+            highest + 1,
+        )
+
+    if not final:
+        print("Next build is build %d." % (highest + 1))
+    print("Each repository's new tag will be:")
+    report_release_state(state, next_tag_avail)
+
+    reply = ask("Should each repository be tagged with this new build tag and pushed? ")
+    if not reply.startswith("Y") and not reply.startswith("y"):
+        return tag_avail
+
+    return tag_and_push(state, tag_avail, next_tag_avail, final)
+
+
+def tag_and_push(state, tag_avail, next_tag_avail, final):
+    """If interrupted anywhere, it makes no change, and returns the original tag_avail"""
+
+    # Create temporary directory to make changes in.
+    tmpdir = setup_temp_git_checkout(
+        state, "integration", state["integration"]["following"]
+    )
+    try:
+        prev_version = tag_index(None, tmpdir).prev_version(
+            next_tag_avail["integration"]["build_tag"]
+        )
+
+        changelogs = []
+
+        # Modify docker tags in docker-compose file.
+        versions = {}
+        for repo in Component.get_components_of_type("git"):
+            if repo.is_independent_component():
+                version = (next_tag_avail[repo.git()]["build_tag"], None)
+            else:
+                version = (
+                    next_tag_avail["image_tag"],
+                    next_tag_avail[repo.git()]["build_tag"],
+                )
+            for yml in repo.yml_components():
+                versions[yml.yml()] = version
+        set_docker_compose_versions_to(tmpdir, versions)
+
+        for repo in sorted(Component.get_components_of_type("git"), key=repo_sort_key):
+            if prev_version:
+                try:
+                    prev_repo_version = version_of(
+                        os.path.join(state["repo_dir"], "integration"),
+                        repo.yml_components()[0],
+                        in_integration_version=prev_version,
+                    )
+                except KeyError:
+                    # Means that this repo didn't exist in earlier integration
+                    # versions.
+                    prev_repo_version = None
+            else:
+                prev_repo_version = None
+            if prev_repo_version:
+                if prev_repo_version != next_tag_avail[repo.git()]["build_tag"]:
+                    changelogs.append(
+                        "Changelog: Upgrade %s to %s."
+                        % (repo.git(), next_tag_avail[repo.git()]["build_tag"])
+                    )
+            else:
+                changelogs.append(
+                    "Changelog: Add %s %s."
+                    % (repo.git(), next_tag_avail[repo.git()]["build_tag"])
+                )
+        if len(changelogs) == 0:
+            changelogs.append("Changelog: None")
+
+        print_line()
+        print("Changes to commit:")
+        print()
+        execute_git(state, tmpdir, ["diff"])
+        git_list = []
+        git_list.append(
+            (
+                state,
+                tmpdir,
+                [
+                    "commit",
+                    "-a",
+                    "-s",
+                    "-m",
+                    "%s %s.\n\n%s"
+                    % (
+                        VERSION_BUMP_STRING,
+                        next_tag_avail["integration"]["build_tag"],
+                        "\n".join(changelogs),
+                    ),
+                ],
+            )
+        )
+        if not query_execute_git_list(git_list):
+            return tag_avail
+
+        # Because of the commit above, integration repository now has a new SHA.
+        sha = execute_git(
+            state, tmpdir, ["rev-parse", "--short", "HEAD~0"], capture=True
+        )
+        next_tag_avail["integration"]["sha"] = sha
+        # Fetch the SHA from the tmpdir to make the object available in the
+        # original repository.
+        execute_git(state, "integration", ["fetch", tmpdir, "HEAD"], capture=True)
+    finally:
+        cleanup_temp_git_checkout(tmpdir)
+
+    # Prepare Git tag and push commands.
+    git_tag_list = []
+    git_push_list = []
+    for repo in Component.get_components_of_type("git"):
+        if not next_tag_avail[repo.git()]["already_released"]:
+            git_tag_list.append(
+                (
+                    state,
+                    repo.git(),
+                    [
+                        "tag",
+                        "-a",
+                        "-m",
+                        annotation_version(repo, next_tag_avail),
+                        next_tag_avail[repo.git()]["build_tag"],
+                        next_tag_avail[repo.git()]["sha"],
+                    ],
+                )
+            )
+            remote = find_upstream_remote(state, repo.git())
+            git_push_list.append(
+                (
+                    state,
+                    repo.git(),
+                    ["push", remote, next_tag_avail[repo.git()]["build_tag"]],
+                )
+            )
+
+    # Tag all repositories first, one at a time, and stop at the first failure,
+    # so that nothing is pushed unless every tag could be created. The pushes
+    # are independent of each other, but may ask for credentials, so they only
+    # run concurrently, and are retried, if asked to with --jobs.
+    if CONTEXT.concurrent_pushes:
+        ok = query_execute_git_list(
+            git_tag_list, then_concurrently=git_push_list, then_retries=RETRIES
+        )
+    else:
+        ok = query_execute_git_list(git_tag_list + git_push_list)
+    if not ok:
+        return tag_avail
+
+    # If this was the final tag, reflect that in our data.
+    for repo in Component.get_components_of_type("git"):
+        if not next_tag_avail[repo.git()]["already_released"] and final:
+            next_tag_avail[repo.git()]["already_released"] = True
+
+    return next_tag_avail
+
+
+def get_extra_buildparams(context=None):
+    if context is None:
+        context = CONTEXT
+    if context.extra_buildparams is not None:
+        pass
+    elif context.use_gitlab:
+        context.extra_buildparams = get_extra_buildparams_from_yaml(context)
+    else:
+        context.extra_buildparams = get_extra_buildparams_from_jenkins(context)
+    return context.extra_buildparams
+
+
+def get_extra_buildparams_from_jenkins(context=None):
+    if context is None:
+        context = CONTEXT
+    init_jenkins_creds(context)
+    if not context.jenkins_user or not context.jenkins_password:
+        logging.warn(JENKINS_CREDS_MISSING_ERR)
+
+    # Fetch list of parameters from Jenkins.
+    jobInfo = json.loads(
+        http_get_cached(
+            "%s/%s/api/json" % (JENKINS_SERVER, JENKINS_JOB),
+            context=context,
+            auth=(context.jenkins_user, context.jenkins_password),
+            verify=False,
+        )
+    )
+    parameters = [
+        prop["parameterDefinitions"]
+        for prop in jobInfo["property"]
+        if prop["_class"] == "hudson.model.ParametersDefinitionProperty"
+    ]
+    assert len(parameters) == 1, (
+        "Was expecting one hudson.model.ParametersDefinitionProperty, got %d"
+        % len(parameters)
+    )
+    parameters = parameters[0]
+
+    def jenkinsParamToDefaultMap(param):
+        if param["type"] == "BooleanParameterDefinition":
+            type = "bool"
+            value = "on" if param["defaultParameterValue"]["value"] else ""
+        elif param["type"] == "StringParameterDefinition":
+            type = "string"
+            if param.get("defaultParameterValue") is None:
+                value = ""
+            else:
+                value = param["defaultParameterValue"]["value"]
+        else:
+            raise Exception(
+                "Parameter has unknown type %s. Don't know how to handle that!"
+                % param["type"]
+            )
+        return (param["name"], type, value)
+
+    # Add all fetched parameters that are not part of our versioned repositories
+    # as extra build parameters.
+    extra_buildparams = {}
+    in_versioned_repos = {}
+    for repo in Component.get_components_of_type("git"):
+        if repo.git() in GIT_TO_BUILDPARAM_MAP:
+            in_versioned_repos[GIT_TO_BUILDPARAM_MAP[repo.git()]] = True
+
+    for key, type, value in [jenkinsParamToDefaultMap(param) for param in parameters]:
+        # Skip keys that are in versioned repos.
+        if not in_versioned_repos.get(key):
+            extra_buildparams[key] = BuildParam(type, value)
+
+    return extra_buildparams
+
+
+def get_extra_buildparams_from_yaml(context=None):
+    reply = http_get_cached(
+        "https://raw.githubusercontent.com/mendersoftware/mender-qa/master/.gitlab-ci.yml",
+        context=context,
+    )
+    build_variables = load_yaml(reply).get("variables")
+    assert isinstance(build_variables, dict)
+
+    # Add all fetched parameters that are not part of our versioned repositories
+    # as extra build parameters.
+    extra_buildparams = {}
+    in_versioned_repos = {}
+    for repo in Component.get_components_of_type("git"):
+        if repo.git() in GIT_TO_BUILDPARAM_MAP:
+            in_versioned_repos[GIT_TO_BUILDPARAM_MAP[repo.git()]] = True
+
+    for key, value in build_variables.items():
+        if not in_versioned_repos.get(key):
+            extra_buildparams[key] = BuildParam("string", value)
+
+    return extra_buildparams
+
+
+def trigger_build(state, tag_avail):
+    extra_buildparams = get_extra_buildparams()
+
+    with state_transaction(state):
+        for param in extra_buildparams.keys():
+            if state_value(state, ["extra_buildparams", param]) is None:
+                update_state(
+                    state, ["extra_buildparams", param], extra_buildparams[param].value
+                )
+
+    params = None
+
+    # Allow changing of build parameters.
+    while True:
+        if params is None:
+            # We'll be adding parameters here that shouldn't be in 'state', so make a
+            # copy.
+            params = copy.deepcopy(state["extra_buildparams"])
+
+            # Populate parameters with build tags for each repository.
+            for repo in sorted(
+                Component.get_components_of_type("git"), key=repo_sort_key
+            ):
+                if tag_avail[repo.git()].get("build_tag") is None:
+                    print("%s doesn't have a build tag yet!" % repo.git())
+                    return
+                params[GIT_TO_BUILDPARAM_MAP[repo.git()]] = tag_avail[repo.git()][
+                    "build_tag"
+                ]
+
+        print_line()
+        fmt_str = "%-50s %-20s"
+        print(fmt_str % ("Build parameter", "Value"))
+        for param in sorted(params.keys()):
+            print(fmt_str % (param, params[param]))
+
+        reply = ask("Will trigger a build with these values, ok? (no) ")
+        if reply.startswith("Y") or reply.startswith("y"):
+            break
+
+        reply = ask(
+            "Do you want to change any of the parameters (Y/N/open in Editor)? "
+        )
+        if reply.upper().startswith("E"):
+            if os.environ.get("EDITOR"):
+                editor = os.environ.get("EDITOR")
+            else:
+                editor = "vi"
+            # The file must be complete before the user sees it.
+            save_state(state)
+            subprocess.call("%s %s" % (editor, CONTEXT.state_file), shell=True)
+            new_state = load_state(CONTEXT.state_file)
+            state.clear()
+            state.update(new_state)
+            # Trigger update of parameters from disk.
+            params = None
+            continue
+        elif not reply.upper().startswith("Y"):
+            return
+
+        substr = ask("Which one (substring is ok as long as it's unique)? ")
+        found = 0
+        for param in params.keys():
+            if param == substr:
+                # Exact match
+                name = param
+                found = 1
+                break
+            if param.find(substr) >= 0:
+                name = param
+                found += 1
+        if found == 0:
+            print("Parameter not found!")
+            continue
+        elif found > 1:
+            print("String not unique!")
+            continue
+        params[name] = ask("Ok. New value? ")
+
+        if extra_buildparams.get(name) is not None:
+            # Extra build parameters, that are not part of the build tags for
+            # each repository, should be saved persistently in the state file so
+            # that they can be repeated in subsequent builds.
+            update_state(state, ["extra_buildparams", name], params[name])
+
+    if CONTEXT.use_gitlab:
+        trigger_gitlab_build(params, extra_buildparams)
+    else:
+        trigger_jenkins_build(params, extra_buildparams)
+
+
+def trigger_jenkins_build(params, extra_buildparams, context=None):
+    try:
+        import requests
+    except ImportError:
+        print("requests module missing, try running 'sudo pip3 install requests'.")
+        sys.exit(2)
+
+    if context is None:
+        context = CONTEXT
+    init_jenkins_creds(context)
+    if not context.jenkins_user or not context.jenkins_password:
+        raise SystemExit(JENKINS_CREDS_MISSING_ERR)
+
+    # Order is important here, because Jenkins passes in the same parameters
+    # multiple times, as pairs that complete each other.
+    # Jenkins additionally needs the input as json as well, so create that from
+    # above parameters.
+    postdata = []
+    jdata = {"parameter": []}
+    for param in params.items():
+        postdata.append(("name", param[0]))
+        if param[1] != "":
+            postdata.append(("value", param[1]))
+
+        if (
+            extra_buildparams.get(param[0]) is not None
+            and extra_buildparams[param[0]].type == "bool"
+        ):
+            if param[1] == "on":
+                jdata["parameter"].append({"name": param[0], "value": True})
+            elif param[1] == "":
+                jdata["parameter"].append({"name": param[0], "value": False})
+        else:
+            jdata["parameter"].append({"name": param[0], "value": param[1]})
+
+    try:
+        postdata.append(("statusCode", "303"))
+        jdata["statusCode"] = "303"
+        postdata.append(("redirectTo", "."))
+        jdata["redirectTo"] = "."
+        postdata.append(("json", json.dumps(jdata)))
+
+        url = "%s/%s/build?delay=0sec" % (JENKINS_SERVER, JENKINS_JOB)
+        with context.trace("http", "POST %s" % url.split("/")[2], url=url) as details:
+            reply = requests.post(
+                url,
+                data=postdata,
+                auth=(context.jenkins_user, context.jenkins_password),
+                verify=False,
+            )
+            details["status"] = reply.status_code
+        if reply.status_code < 200 or reply.status_code >= 300:
+            print("Request returned: %d: %s" % (reply.status_code, reply.reason))
+        else:
+            print("Build started.")
+            # Crude way to find build number, pick first number starting with a
+            # hash between two html tags.
+            match = re.search(">#([0-9]+)<", reply.content.decode())
+            if match is not None:
+                print("Link: %s/%s/%s/" % (JENKINS_SERVER, JENKINS_JOB, match.group(1)))
+            else:
+                print("Unable to determine build number.")
+    except Exception:
+        print("Failed to start build:")
+        traceback.print_exc()
+
+
+def trigger_gitlab_build(params, extra_buildparams, context=None):
+
+    try:
+        import requests
+    except ImportError:
+        print("requests module missing, try running 'sudo pip3 install requests'.")
+        sys.exit(2)
+
+    if context is None:
+        context = CONTEXT
+    init_gitlab_creds(context)
+    if not context.gitlab_token:
+        raise SystemExit(GITLAB_CREDS_MISSING_ERR)
+
+    headers = {"PRIVATE-TOKEN": context.gitlab_token}
+
+    match = re.match("^pull/([0-9]+)/head$", params["MENDER_QA_REV"])
+    if match is not None:
+        mender_qa_ref = "pr_" + match.group(1)
+    else:
+        mender_qa_ref = params["MENDER_QA_REV"]
+
+    # Prepare json POST data
+    # See https://docs.gitlab.com/ee/api/pipelines.html#create-a-new-pipeline
+    postdata = {"ref": mender_qa_ref, "variables": []}
+    for key, value in params.items():
+        postdata["variables"].append({"key": key, "value": value})
+    for key, build_param in extra_buildparams.items():
+        if not key in [var["key"] for var in postdata["variables"]]:
+            postdata["variables"].append({"key": key, "value": build_param.value})
+
+    try:
+        url = "%s/%s/pipeline" % (GITLAB_SERVER, GITLAB_JOB)
+        with context.trace("http", "POST %s" % url.split("/")[2], url=url) as details:
+            reply = requests.post(url, json=postdata, headers=headers)
+            details["status"] = reply.status_code
+
+        if reply.status_code < 200 or reply.status_code >= 300:
+            print(
+                "Request returned: %d: %s\n%s"
+                % (reply.status_code, reply.reason, reply.content.decode("latin-1"))
+            )
+        else:
+            print("Build started.")
+            print("Link: %s" % reply.json().get("web_url"))
+
+    except Exception:
+        print("Failed to start build:")
+        traceback.print_exc()
+
+
+def do_license_generation(state, tag_avail):
+    print("Setting up temporary Git workspace...")
+
+    def tag_or_followed_branch(repo_git):
+        if tag_avail[repo_git].get("build_tag") is None:
+            return state[repo_git]["following"]
+        else:
+            return tag_avail[repo_git]["build_tag"]
+
+    checkouts = []
+    for repo in Component.get_components_of_type("git", only_release=True):
+        checkouts.append((repo.git(), tag_or_followed_branch(repo.git())))
+    for repo in Component.get_components_of_type("git", only_non_release=True):
+        remote = find_upstream_remote(state, repo.git())
+        checkouts.append((repo.git(), remote + "/master"))
+
+    # The checkouts are independent of each other, so prepare them all at once.
+    tmpdirs = [None] * len(checkouts)
+
+    def checkout_task(index, repo_git, ref):
+        def task():
+            tmpdirs[index] = setup_temp_git_checkout(state, repo_git, ref)
+
+        return ("%s (%s)" % (repo_git, ref), task)
+
+    execute_concurrently(
+        [
+            checkout_task(index, repo_git, ref)
+            for index, (repo_git, ref) in enumerate(checkouts)
+        ]
+    )
+
+    try:
+        with open("generated-license-text.txt", "w") as fd, trace(
+            "subprocess", "license-overview-generator"
+        ):
+            subprocess.check_call(
+                [
+                    os.path.realpath(
+                        os.path.join(
+                            os.path.dirname(sys.argv[0]), "license-overview-generator"
+                        )
+                    ),
+                    "--called-from-release-tool",
+                    "--dir",
+                    os.path.dirname(tmpdirs[0]),
+                ],
+                stdout=fd,
+            )
+
+        gui_tag = "mendersoftware/gui:tmp"
+        for tmpdir in tmpdirs:
+            if os.path.basename(tmpdir) == "gui":
+                query_execute_list(
+                    [
+                        [
+                            "docker",
+                            "build",
+                            "-t",
+                            gui_tag,
+                            "-f",
+                            os.path.join(tmpdir, "Dockerfile.disclaimer"),
+                            tmpdir,
+                        ]
+                    ]
+                )
+                break
+
+        executed = query_execute_list(
+            [
+                [
+                    "docker",
+                    "run",
+                    "-d",
+                    "--name",
+                    "release_tool_gui_licenses",
+                    gui_tag,
+                    "/bin/sh",
+                    "-c",
+                    "while true; do sleep 1; done",
+                ],
+                [
+                    "docker",
+                    "cp",
+                    "release_tool_gui_licenses:/usr/src/app/disclaimer.txt",
+                    "gui-licenses.txt",
+                ],
+                ["docker", "rm", "-f", "release_tool_gui_licenses"],
+            ]
+        )
+        if not executed:
+            return
+
+    except subprocess.CalledProcessError:
+        print()
+        print("Command failed with the above error.")
+        return
+    finally:
+        for tmpdir in tmpdirs:
+            cleanup_temp_git_checkout(tmpdir)
+
+    with open("generated-license-text.txt", "a") as fd, open(
+        "gui-licenses.txt"
+    ) as gui_licenses:
+        fd.write(
+            "--------------------------------------------------------------------------------\n"
+        )
+        fd.write(gui_licenses.read())
+    os.remove("gui-licenses.txt")
+
+    print_line()
+    print("License overview successfully generated!")
+    print("Output is captured in generated-license-text.txt.")
+
+
+def set_docker_compose_version_to(dir, repo, tag, git_tag=None):
+    """Modifies docker-compose files in the given directory so that repo_docker
+    image points to the given tag. See set_docker_compose_versions_to."""
+
+    set_docker_compose_versions_to(
+        dir, {yml.yml(): (tag, git_tag) for yml in repo.yml_components()}
+    )
+
+
+def set_docker_compose_versions_to(dir, versions):
+    """Modifies docker-compose files in the given directory so that the images in
+    versions point to new tags. versions is a dictionary from yml component name
+    to a (tag, git_tag) pair. tag is used in the files that list Docker
+    versions, and git_tag, unless it is None, in the files that only list Git
+    versions.
+
+    All images are replaced in a single pass over each file, and only files
+    which change are rewritten. Returns a unified diff of the changes."""
+
+    if len(versions) == 0:
+        return ""
+    # Longest names first, so that a name which is a prefix of another one
+    # cannot shadow it.
+    images = sorted(versions.keys(), key=len, reverse=True)
+    pattern = re.compile(
+        r"^(\s*image:.*(?:mendersoftware|mender\.io).*/(%s):)\S+(\s*)$"
+        % "|".join([re.escape(image) for image in images])
+    )
+
+    compose_files_docker = docker_compose_files_list(dir, "docker")
+    # Avoid rewriting duplicated files (client and other-components)
+    compose_files_git = [
+        filename
+        for filename in docker_compose_files_list(dir, "git")
+        if filename not in compose_files_docker
+    ]
+
+    diff = []
+    for filenames, column in [(compose_files_docker, 0), (compose_files_git, 1)]:
+
+        def replace(match):
+            version = versions[match.group(2)][column]
+            if version is None:
+                return match.group(0)
+            return match.group(1) + version + match.group(3)
+
+        for filename in filenames:
+            with open(filename) as fd:
+                old = fd.readlines()
+            new = [pattern.sub(replace, line) for line in old]
+            if new == old:
+                continue
+
+            with open(filename + ".tmp", "w") as fd:
+                fd.writelines(new)
+            os.replace(filename + ".tmp", filename)
+
+            name = os.path.relpath(filename, dir)
+            diff.extend(difflib.unified_diff(old, new, "a/" + name, "b/" + name))
+
+    return "".join(diff)
+
+
+def purge_build_tags(state, tag_avail):
+    """Gets rid of all tags in all repositories that match the current version
+    of each repository and ends in '-build[0-9]+'. Then deletes this from
+    upstream as well."""
+
+    git_list = []
+    for repo in Component.get_components_of_type("git"):
+        remote = find_upstream_remote(state, repo.git())
+        to_purge = tag_index(state, repo.git()).build_tags(state[repo.git()]["version"])
+        if len(to_purge) > 0:
+            git_list.append(
+                (
+                    state,
+                    repo.git(),
+                    ["push", remote] + [":%s" % tag for tag in to_purge],
+                )
+            )
+            git_list.append((state, repo.git(), ["tag", "-d"] + to_purge))
+
+    query_execute_git_list(git_list)
+
+
+def find_default_following_branch(state, repo, version):
+    remote = find_upstream_remote(state, repo.git())
+    branch = re.sub(r"\.[^.]+$", ".x", version)
+    return "%s/%s" % (remote, branch)
+
+
+def assign_default_following_branch(state, repo):
+    update_state(
+        state,
+        [repo.git(), "following"],
+        find_default_following_branch(state, repo, state[repo.git()]["version"]),
+    )
+
+
+def merge_release_tag(state, tag_avail, repo):
+    """Merge tag into version branch, but only for Git history's sake, the 'ours'
+    merge strategy keeps the branch as it is, the changes in the tag are not
+    pulled in. Without this merge, Git won't auto-grab tags without using "git
+    fetch --tags", which is inconvenient for users.
+    """
+
+    if not tag_avail[repo.git()]["already_released"]:
+        print("Repository must have a final release tag before the tag can be merged!")
+        return
+
+    # Do the job in a temporary Git repo. Note that we check out the currently
+    # followed branch, which may theoretically be later than the released tag.
+    # This is because this needs to be pushed to the tip of the branch, not to
+    # where the tag is.
+    tmpdir = setup_temp_git_checkout(state, repo.git(), state[repo.git()]["following"])
+    try:
+        # Get a branch name for the currently checked out branch.
+        branch = execute_git(
+            state, tmpdir, ["symbolic-ref", "--short", "HEAD"], capture=True
+        )
+
+        # Merge the tag into it.
+        git_list = [
+            (
+                (
+                    state,
+                    tmpdir,
+                    [
+                        "merge",
+                        "-s",
+                        "ours",
+                        "-m",
+                        "Merge tag %s into %s using 'ours' merge strategy."
+                        % (tag_avail[repo.git()]["build_tag"], branch),
+                        tag_avail[repo.git()]["build_tag"],
+                    ],
+                )
+            )
+        ]
+        if not query_execute_git_list(git_list):
+            return
+
+        # And then fetch that object back into the original repository, which
+        # remains untouched.
+        execute_git(state, repo.git(), ["fetch", tmpdir, branch])
+
+        # Push it to upstream.
+        upstream = find_upstream_remote(state, repo.git())
+        git_list = [
+            (
+                (
+                    state,
+                    repo.git(),
+                    ["push", upstream, "FETCH_HEAD:refs/heads/%s" % branch],
+                )
+            )
+        ]
+        if not query_execute_git_list(git_list):
+            return
+    finally:
+        cleanup_temp_git_checkout(tmpdir)
+
+
+def push_latest_docker_tags(state, tag_avail):
+    """Make all the Docker ":latest" tags point to the current release."""
+
+    for repo in Component.get_components_of_type("git"):
+        if not tag_avail[repo.git()]["already_released"]:
+            print(
+                'You cannot push the ":latest" Docker tags without making final release tags first!'
+            )
+            return
+
+    print("This requires the versioned containers to be built and pushed already.")
+    reply = ask("Has the final build finished successfully? ")
+    if not reply.startswith("Y") and not reply.startswith("y"):
+        return
+
+    # For independent components, we need to generate a new one for each repository;
+    # for backend services, we will use the overall ones
+    overall_minor_version = (
+        "mender-" + state["version"][0 : state["version"].rindex(".")]
+    )
+    overall_major_version = (
+        "mender-" + state["version"][0 : state["version"].index(".")]
+    )
+
+    compose_data = get_docker_compose_data_for_rev(
+        integration_dir(), tag_avail["integration"]["sha"], "docker"
+    )
+
+    for tip in [overall_minor_version, overall_major_version, "latest"]:
+        reply = ask('Do you want to update ":%s" tags? ' % tip)
+        if not reply.startswith("Y") and not reply.startswith("y"):
+            continue
+
+        exec_list = []
+        for image in Component.get_components_of_type("docker_image"):
+            # Even though the version is already in 'tip', this is for the
+            # overall Mender version. We need the specific one for the
+            # repository.
+            repo = image.associated_components_of_type("git")[0]
+            if tip == "latest":
+                new_version = "latest"
+            elif tip.startswith("mender-") and tip.count(".") == 1:
+                if image.is_independent_component():
+                    new_version = state[repo.git()]["version"][
+                        0 : state[repo.git()]["version"].rindex(".")
+                    ]
+                else:
+                    new_version = overall_minor_version
+            elif tip.startswith("mender-") and tip.count(".") == 0:
+                if image.is_independent_component():
+                    new_version = state[repo.git()]["version"][
+                        0 : state[repo.git()]["version"].index(".")
+                    ]
+                else:
+                    new_version = overall_major_version
+            else:
+                raise Exception(
+                    "Unrecognized tip %s, expected 'latest', mender-M.N or mender-M"
+                    % tip
+                )
+
+            prefix = compose_data[image.docker_image()]["image_prefix"]
+
+            if image.is_independent_component():
+                build_tag = tag_avail[repo.git()]["build_tag"]
+            else:
+                build_tag = tag_avail["image_tag"]
+
+            exec_list.append(
+                [
+                    "docker",
+                    "pull",
+                    "%s/%s:%s" % (prefix, image.docker_image(), build_tag,),
+                ]
+            )
+            exec_list.append(
+                [
+                    "docker",
+                    "tag",
+                    "%s/%s:%s" % (prefix, image.docker_image(), build_tag,),
+                    "%s/%s:%s" % (prefix, image.docker_image(), new_version),
+                ]
+            )
+            exec_list.append(
+                [
+                    "docker",
+                    "push",
+                    "%s/%s:%s" % (prefix, image.docker_image(), new_version),
+                ]
+            )
+
+        # Each image is pulled, tagged and pushed in order, but the images are
+        # independent of each other.
+        query_execute_list(exec_list, concurrent=True, retries=RETRIES)
+
+
+def create_release_branches(state, tag_avail):
+    print("Checking if any repository needs a new branch...")
+
+    any_repo_needs_branch = False
+
+    for repo in Component.get_components_of_type("git"):
+        if tag_avail[repo.git()]["already_released"]:
+            continue
+
+        remote = find_upstream_remote(state, repo.git())
+
+        try:
+            execute_git(
+                state,
+                repo.git(),
+                ["rev-parse", state[repo.git()]["following"]],
+                capture=True,
+                capture_stderr=True,
+            )
+        except subprocess.CalledProcessError:
+            any_repo_needs_branch = True
+            print_line()
+            reply = ask(
+                (
+                    "%s does not have a branch '%s'. Would you like to create it, "
+                    + "and base it on latest '%s/master' (if you don't want to base "
+                    + "it on '%s/master' you have to do it manually)? "
+                )
+                % (repo.git(), state[repo.git()]["following"], remote, remote)
+            )
+            if not reply.startswith("Y") and not reply.startswith("y"):
+                continue
+
+            cmd_list = []
+            cmd_list.append(
+                (
+                    state,
+                    repo.git(),
+                    [
+                        "push",
+                        remote,
+                        "%s/master:refs/heads/%s"
+                        # Slight abuse of basename() to get branch basename.
+                        % (remote, os.path.basename(state[repo.git()]["following"])),
+                    ],
+                )
+            )
+            query_execute_git_list(cmd_list)
+
+    if any_repo_needs_branch:
+        reply = ask(
+            "Do you want to update all the docker-compose files to new branch values in integration? "
+        )
+        if reply.upper().startswith("Y"):
+            do_docker_compose_branches_from_follows(state)
+    else:
+        # Matches the beginning text above.
+        print("No.")
+
+
+def do_beta_to_final_transition(state):
+    with state_transaction(state):
+        for repo in Component.get_components_of_type("git"):
+            version = state[repo.git()]["version"]
+            version = re.sub("b[0-9]+$", "", version)
+            update_state(state, [repo.git(), "version"], version)
+
+        version = state["version"]
+        version = re.sub("b[0-9]+$", "", version)
+        update_state(state, ["version"], version)
+
+
+def do_docker_compose_branches_from_follows(state):
+    remote = find_upstream_remote(state, "integration")
+    checkout = setup_temp_git_checkout(
+        state, "integration", state["integration"]["following"]
+    )
+
+    # For the Docker images, use M.N.x as the release branch
+    version_minor = state["version"][0 : state["version"].rindex(".")]
+    mender_branch = "mender-" + version_minor + ".x"
+
+    try:
+        versions = {}
+        for repo in Component.get_components_of_type("git"):
+            branch = state[repo.git()]["following"]
+            slash = branch.rfind("/")
+            if slash >= 0:
+                bare_branch = branch[slash + 1 :]
+            else:
+                bare_branch = branch
+
+            for yml in repo.yml_components():
+                if repo.is_independent_component():
+                    versions[yml.yml()] = (bare_branch, None)
+                else:
+                    versions[yml.yml()] = (mender_branch, bare_branch)
+
+        diff = set_docker_compose_versions_to(checkout, versions)
+        print("This is the diff:")
+        print(diff)
+
+        bare_branch = re.sub(".*/", "", state["integration"]["following"])
+        cmd = [
+            "commit",
+            "-asm",
+            """Update branch references for %s.
+
+Changelog: None"""
+            % bare_branch,
+        ]
+        if not query_execute_git_list([(state, checkout, cmd)]):
+            return
+
+        if state["integration"]["following"] == bare_branch:
+            print(
+                """Cannot push the update docker-compose files if integration is not following a
+remote branch. Stopping here so that you can push yourself if desired.
+The result commit has been put in %s,
+which will be removed after you press Enter. Please enter the push command there
+if you wish to push the new commit.
+"""
+                % checkout
+            )
+            ask("Press Enter when finished...")
+            return
+
+        execute_git(state, "integration", ["fetch", checkout, bare_branch])
+
+        if not query_execute_git_list(
+            [
+                (
+                    state,
+                    "integration",
+                    ["push", remote, "FETCH_HEAD:refs/heads/%s" % bare_branch],
+                )
+            ]
+        ):
+            return
+
+    finally:
+        cleanup_temp_git_checkout(checkout)
+
+    print()
+    print("After this it is usually a good idea to re-fetch git repos,")
+    print("so will ask about that next.")
+    ask("Press Enter...")
+    refresh_repos(state)
+
+
+def do_build(args):
+    """Handles building: triggering a build of the given Mender version. Saves
+    the used parameters in the home directory so they can be reused in the next
+    build."""
+
+    state_file = os.path.join(os.environ["HOME"], ".release-tool.yml")
+    if os.path.exists(state_file):
+        print("Fetching cached parameters from %s (delete to reset)." % state_file)
+    state = load_state(state_file)
+
+    if state_value(state, ["repo_dir"]) is None:
+        repo_dir = os.path.normpath(os.path.join(integration_dir(), ".."))
+        print(
+            (
+                "Guessing that your directory of all repositories is %s. "
+                + "Edit %s manually to change it."
+            )
+            % (repo_dir, CONTEXT.state_file)
+        )
+        update_state(state, ["repo_dir"], repo_dir)
+
+    if args.build is True:
+        if state_value(state, ["version"]) is None:
+            print(
+                "When there is no earlier cached build, you must give --build a VERSION argument."
+            )
+            sys.exit(1)
+        tag_avail = check_tag_availability(state)
+    else:
+        with state_transaction(state):
+            update_state(state, ["version"], args.build)
+            for repo in Component.get_components_of_type("git"):
+                if repo.git() == "integration":
+                    update_state(state, [repo.git(), "version"], args.build)
+                else:
+                    version = version_of(
+                        integration_dir(), repo.yml_components()[0], args.build
+                    )
+                    update_state(state, [repo.git(), "version"], version)
+        tag_avail = check_tag_availability(state)
+        for repo in Component.get_components_of_type("git"):
+            tag_avail[repo.git()]["build_tag"] = state[repo.git()]["version"]
+
+    extra_buildparams = get_extra_buildparams()
+
+    for pr in args.pr or []:
+        match = re.match("^([^/]+)/([0-9]+)$", pr)
+        if match is not None:
+            pr_str = "pull/%s/head" % match.group(2)
+        else:
+            match = re.match("^([^/]+)/(.+)$", pr)
+            if match is not None:
+                pr_str = match.group(2)
+            else:
+                raise Exception("%s is not a valid repo/pr or repo/branch pair!" % pr)
+        repo = match.group(1)
+        assert repo in GIT_TO_BUILDPARAM_MAP.keys(), (
+            "%s needs to be in GIT_TO_BUILDPARAM_MAP" % repo
+        )
+        if GIT_TO_BUILDPARAM_MAP[repo] in extra_buildparams:
+            # For non-version repos
+            update_state(
+                state, ["extra_buildparams", GIT_TO_BUILDPARAM_MAP[repo]], pr_str
+            )
+        else:
+            # For versioned Mender repos.
+            tag_avail[repo]["build_tag"] = pr_str
+
+    trigger_build(state, tag_avail)
+
+
+def determine_version_to_include_in_release(state, repo):
+    """Returns True if the user decided on the component, False if the user
+    skips the decision for later"""
+
+    version = state_value(state, [repo.git(), "version"])
+
+    if version is not None:
+        return True
+
+    # Is there already a version in the same series? Look at integration.
+    prev_of_integration = tag_index(None, integration_dir()).prev_version(
+        state["version"]
+    )
+    (overall_major, overall_minor, _, overall_beta) = version_components(
+        state["version"]
+    )
+    (prev_major, prev_minor, _, _) = version_components(prev_of_integration)
+
+    prev_of_repo = None
+    prev_of_repo_independent = None
+    new_repo_version = None
+    follow_branch = None
+    if overall_major == prev_major and overall_minor == prev_minor:
+        # Same series. Us it as basis.
+        prev_of_repo = version_of(
+            integration_dir(),
+            repo.yml_components()[0],
+            in_integration_version=prev_of_integration,
+        )
+        if overall_beta is not None:
+            (major, minor, patch, _) = version_components(prev_of_repo)
+            new_repo_version = "%d.%d.%db%d" % (major, minor, patch, overall_beta)
+        else:
+            new_repo_version = find_patch_version(
+                state, repo, prev_of_repo, next_unreleased=True
+            )
+            prev_of_repo_independent = find_patch_version(
+                state, repo, prev_of_repo, last_released=True
+            )
+        follow_branch = find_default_following_branch(state, repo, new_repo_version)
+    else:
+        # No series exists. Base on master.
+        version_list = sorted_final_version_list(
+            os.path.join(state["repo_dir"], repo.git())
+        )
+        if len(version_list) > 0:
+            prev_of_repo = version_list[0]
+            (major, minor, _, _) = version_components(prev_of_repo)
+            new_repo_version = "%d.%d.0" % (major, minor + 1)
+        else:
+            # No previous version at all. Start at 1.0.0.
+            prev_of_repo = None
+            new_repo_version = "1.0.0"
+        prev_of_repo_independent = prev_of_repo
+        if overall_beta:
+            new_repo_version += "b%d" % overall_beta
+        follow_branch = "%s/master" % find_upstream_remote(state, repo.git())
+
+    if prev_of_repo:
+        print_line()
+
+        git_cmd = ["log", "%s..%s" % (prev_of_repo, follow_branch)]
+        print("cd %s && git %s:" % (repo.git(), " ".join(git_cmd)))
+        execute_git(state, repo.git(), git_cmd)
+
+        print()
+        print()
+
+        changelog_cmd = [
+            os.path.join(
+                integration_dir(), "extra/changelog-generator/changelog-generator"
+            ),
+            "--repo",
+            "%s..%s" % (prev_of_repo, follow_branch),
+        ]
+        print("cd %s && %s:" % (repo.git(), " ".join(changelog_cmd)))
+        with trace("subprocess", "changelog-generator", repo=repo.git()):
+            subprocess.check_call(
+                changelog_cmd, cwd=os.path.join(state["repo_dir"], repo.git())
+            )
+
+        print_line()
+        print(
+            "Above is the output of:\n\ncd %s\ngit %s\n%s\n"
+            % (repo.git(), " ".join(git_cmd), " ".join(changelog_cmd))
+        )
+
+        if prev_of_repo_independent and prev_of_repo_independent != prev_of_repo:
+            print(
+                """WARNING: %s is not the latest patch release, the latest patch release
+is %s, which does not occur in any integration version. You might want to
+double check this.
+"""
+                % (prev_of_repo, prev_of_repo_independent)
+            )
+
+        reply = ask(
+            "Based on this, is there a reason for a new release of %s? (Yes/No/Skip) "
+            % repo.git()
+        )
+
+        if reply.lower().startswith("s"):
+            print("Ok. Postponing decision on %s for later" % repo.git())
+            print()
+            print_line()
+            return False
+
+    if not prev_of_repo or reply.lower().startswith("y"):
+        reply = ask(
+            "Should the new release of %s be version %s? "
+            % (repo.git(), new_repo_version)
+        )
+        if reply.lower().startswith("y"):
+            update_state(state, [repo.git(), "version"], new_repo_version)
+    else:
+        reply = ask(
+            "Should the release of %s be left at the previous version %s? "
+            % (repo.git(), prev_of_repo)
+        )
+        if reply.lower().startswith("y"):
+            update_state(state, [repo.git(), "version"], prev_of_repo)
+
+    if state_value(state, [repo.git(), "version"]) is None:
+        reply = ask("Ok. Please input the new version of %s manually: " % repo.git())
+        update_state(state, [repo.git(), "version"], reply)
+
+    print()
+    print_line()
+    return True
+
+
+def do_release(release_state_file):
+    """Handles the interactive menu for doing a release."""
+
+    if os.path.exists(release_state_file):
+        while True:
+            reply = ask(
+                "Release already in progress. Continue or start a new one [C/S]? "
+            )
+            if reply == "C" or reply == "c":
+                new_release = False
+            elif reply == "S" or reply == "s":
+                new_release = True
+            else:
+                print("Must answer C or S.")
+                continue
+            break
+    else:
+        print("No existing release in progress, starting new one...")
+        new_release = True
+
+    # Fill the state data.
+    if new_release:
+        CONTEXT.state_file = release_state_file
+        state = {}
+    else:
+        print("Loading existing release state data...")
+        print(
+            "Note that you can always edit or delete %s manually" % release_state_file
+        )
+        state = load_state(release_state_file)
+
+    if state_value(state, ["repo_dir"]) is None:
+        reply = ask("Which directory contains all the Git repositories? ")
+        reply = re.sub("~", os.environ["HOME"], reply)
+        update_state(state, ["repo_dir"], reply)
+
+    if state_value(state, ["version"]) is None:
+        update_state(state, ["version"], ask("Which release of Mender will this be? "))
+
+    update_state(state, ["integration", "version"], state["version"])
+
+    input = ask(
+        "Do you want to fetch all the latest tags and branches in all repositories (will not change checked-out branch)? "
+    )
+    if input.startswith("Y") or input.startswith("y"):
+        refresh_repos(state)
+
+    repos = sorted(Component.get_components_of_type("git"), key=repo_sort_key)
+    while len(repos) > 0:
+        repo = repos.pop(0)
+        if not determine_version_to_include_in_release(state, repo):
+            repos.append(repo)
+
+    # Fill data about available tags.
+    tag_avail = check_tag_availability(state)
+
+    with state_transaction(state):
+        for repo in Component.get_components_of_type("git"):
+            if state_value(state, [repo.git(), "following"]) is None:
+                # Follow "1.0.x" style branches by default.
+                assign_default_following_branch(state, repo)
+
+    create_release_branches(state, tag_avail)
+
+    first_time = True
+    while True:
+        if first_time:
+            first_time = False
+        else:
+            # Provide a break to see output from what was just done.
+            ask("Press Enter... ")
+
+        print_line()
+        print("Current state of release:")
+        report_release_state(state, tag_avail)
+
+        minor_version = state["version"][0 : state["version"].rindex(".")]
+
+        print("What do you want to do?")
+        print("-- Main operations")
+        if (
+            re.search("b[0-9]+$", state["version"])
+            and tag_avail["integration"]["already_released"]
+        ):
+            print("  O) Move from beta build tags to final build tags")
+        print("  R) Refresh all repositories from upstream (git fetch)")
+        print("  T) Generate and push new build tags")
+        print("  B) Trigger new integration build using current tags")
+        print("  L) Generate license text for all dependencies")
+        print("  F) Tag and push final tag, based on current build tag")
+        print(
+            '  D) Update ":%s" and/or ":latest" Docker tags to current release'
+            % minor_version
+        )
+        print("  Q) Quit (your state is saved in %s)" % CONTEXT.state_file)
+        print()
+        print("-- Less common operations")
+        print("  P) Push current build tags (not necessary unless -s was used before)")
+        print("  U) Purge build tags from all repositories")
+        print('  M) Merge "integration" release tag into release branch')
+        print(
+            "  C) Create new series branch (A.B.x style) for each repository that lacks one"
+        )
+        print(
+            "  I) Put currently followed branch names into integration's docker-compose "
+        )
+        print(
+            "     files. Use this to update the integration repository to new branch names"
+        )
+        print("     after you've branched it.")
+
+        reply = ask("Choice? ")
+
+        if reply.lower() == "q":
+            break
+        if reply.lower() == "r":
+            refresh_repos(state)
+            # Refill data about available tags, since it may have changed.
+            tag_avail = check_tag_availability(state)
+        elif reply.lower() == "t":
+            tag_avail = generate_new_tags(state, tag_avail, final=False)
+        elif reply.lower() == "f":
+            tag_avail = generate_new_tags(state, tag_avail, final=True)
+            print()
+            reply = ask("Purge all build tags from all repositories (recommended)? ")
+            if reply.startswith("Y") or reply.startswith("y"):
+                purge_build_tags(state, tag_avail)
+            reply = ask(
+                'Merge "integration" release tag into version branch (recommended)? '
+            )
+            if reply.startswith("Y") or reply.startswith("y"):
+                merge_release_tag(
+                    state,
+                    tag_avail,
+                    Component.get_component_of_type("git", "integration"),
+                )
+        elif reply.lower() == "d":
+            push_latest_docker_tags(state, tag_avail)
+        elif reply.lower() == "p":
+            git_list = []
+            for repo in Component.get_components_of_type("git"):
+                remote = find_upstream_remote(state, repo.git())
+                git_list.append(
+                    (
+                        state,
+                        repo.git(),
+                        ["push", remote, tag_avail[repo.git()]["build_tag"]],
+                    )
+                )
+            query_execute_git_list(git_list)
+        elif reply.lower() == "b":
+            trigger_build(state, tag_avail)
+        elif reply.lower() == "l":
+            do_license_generation(state, tag_avail)
+        elif reply.lower() == "u":
+            purge_build_tags(state, tag_avail)
+        elif reply.lower() == "m":
+            merge_release_tag(
+                state, tag_avail, Component.get_component_of_type("git", "integration")
+            )
+        elif reply.lower() == "c":
+            create_release_branches(state, tag_avail)
+        elif reply.lower() == "o":
+            do_beta_to_final_transition(state)
+            tag_avail = check_tag_availability(state)
+        elif reply.lower() == "i":
+            do_docker_compose_branches_from_follows(state)
+        else:
+            print("Invalid choice!")
+
+
+def do_set_version_to(args):
+    """Handles --set-version-of argument."""
+
+    if args.version is None:
+        print("--set-version-of requires --version")
+        sys.exit(1)
+
+    repo = Component.get_component_of_any_type(args.set_version_of)
+    set_docker_compose_version_to(
+        integration_dir(), repo, args.version, git_tag=args.version
+    )
+
+
+def get_release_components_for_rev(git_dir, rev, context=None):
+    """Returns a map from Git component name to whether it is a release component,
+    according to component-maps.yml in the given integration revision. Returns
+    None if that revision doesn't have a component-maps.yml."""
+
+    if context is None:
+        context = CONTEXT
+    component_maps = git_object_reader(git_dir, context).read(
+        "%s:component-maps.yml" % rev
+    )
+    if component_maps is None:
+        return None
+
+    # Most integration versions share the same few versions of the file, so only
+    # parse each one once.
+    (sha, _, content) = component_maps
+    release_components = context.release_components_by_sha.get(sha)
+    if release_components is None:
+        maps = load_yaml(content.decode())
+        release_components = {
+            name: bool(info.get("release_component"))
+            for name, info in maps["git"].items()
+        }
+        context.release_components_by_sha[sha] = release_components
+    return release_components
+
+
+def is_marked_as_releaseable(
+    release_components, integration_version, repo_git, repo_git_version
+):
+    """Decides whether repo_git is releaseable in integration_version, given the
+    result of get_release_components_for_rev() for that version."""
+
+    if release_components is None:
+        # No component-maps.yml found.
+        if integration_version == "master":
+            # For master branch, we should require that the maps are found, so
+            # that we update the paths in case we move it somewhere.
+            raise Exception(
+                "Could not find component-maps.yml at expected location in master branch. Please fix!"
+            )
+        elif repo_git_version == "master":
+            # If we're looking for the master version of component, and the
+            # component-maps.yml isn't found, we assume that the component is
+            # not releaseable. The reasoning behind this is that no releaseable
+            # component should ever use "master" in any other branch than
+            # integration/master, where we know that component-maps.yml
+            # exists. This gets rid of many false positives from tenantadm,
+            # which is marked as master in a whole range of old integration
+            # versions.
+            return False
+        else:
+            # Else we assume it is releaseable.
+            return True
+
+    # When we have the component-maps.yml data from the given integration
+    # version, do a lookup. Components which were not in the maps yet are not
+    # releaseable in that version.
+    return release_components.get(repo_git, False)
+
+
+def is_marked_as_releaseable_in_integration_version(
+    integration_version, repo_git, repo_git_version
+):
+    # Raises KeyError for unknown components.
+    Component.get_component_of_type("git", repo_git)
+    return is_marked_as_releaseable(
+        get_release_components_for_rev(integration_dir(), integration_version),
+        integration_version,
+        repo_git,
+        repo_git_version,
+    )
+
+
+class IntegrationVersionIndex:
+    """Persistent inverted index over integration refs, which maps each yml
+    component and version to the integration refs that contain it. The index is
+    stored in the on-disk cache, and is updated incrementally: only refs whose
+    SHA has changed since the index was last saved are looked at again.
+
+    Each entry in `refs` looks like this:
+      <refname>:
+        sha: <SHA the ref pointed to when it was indexed>
+        versions:
+          <yml>: <version>
+        release_components: <result of get_release_components_for_rev()>
+    """
+
+    def __init__(self, git_dir):
+        self.git_dir = os.path.realpath(git_dir)
+        self.cache_key = hashlib.sha1(self.git_dir.encode()).hexdigest()
+        self.refs = {}
+        # yml -> version -> set of refnames.
+        self.by_component = {}
+
+        stored = read_cache("integration-index", self.cache_key)
+        if stored is not None:
+            for refname, entry in stored.items():
+                self._add(refname, entry)
+
+    def _add(self, refname, entry):
+        self.refs[refname] = entry
+        for yml, version in entry["versions"].items():
+            self.by_component.setdefault(yml, {}).setdefault(version, set()).add(
+                refname
+            )
+
+    def _remove(self, refname):
+        entry = self.refs.pop(refname)
+        for yml, version in entry["versions"].items():
+            self.by_component[yml][version].discard(refname)
+
+    def update(self, ref_shas, ymls):
+        """Takes a list of (refname, sha) pairs, and indexes all the refs that are
+        new or have changed since the last time, and forgets the refs which are
+        not in the list. ymls are the yml components whose versions are looked
+        up, see index_integration_version(). Saves the index if anything
+        changed."""
+
+        current = set([refname for refname, _ in ref_shas])
+        removed = [refname for refname in self.refs if refname not in current]
+        for refname in removed:
+            self._remove(refname)
+
+        changed = [
+            (refname, sha)
+            for refname, sha in ref_shas
+            if self.refs.get(refname, {}).get("sha") != sha
+        ]
+        if len(changed) == 0:
+            if len(removed) > 0:
+                write_cache("integration-index", self.cache_key, self.refs)
+            return
+
+        # Each ref is independent, so spread them over a pool of worker
+        # processes. Processes rather than threads, because YAML parsing holds
+        # the GIL.
+        args_list = [(self.git_dir, refname, sha, ymls) for refname, sha in changed]
+        if len(changed) > 1:
+            jobs = min(len(changed), os.cpu_count() or 1)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                entries = list(
+                    executor.map(
+                        index_integration_version,
+                        args_list,
+                        chunksize=max(1, len(changed) // (jobs * 4)),
+                    )
+                )
+        else:
+            entries = [index_integration_version(args) for args in args_list]
+
+        for (refname, _), entry in zip(changed, entries):
+            if refname in self.refs:
+                self._remove(refname)
+            self._add(refname, entry)
+
+        write_cache("integration-index", self.cache_key, self.refs)
+
+    def refs_including(self, yml, version):
+        """Returns the set of indexed refs which include the given version of the
+        yml component. Note that this doesn't take releaseability into
+        account."""
+
+        return self.by_component.get(yml, {}).get(version, set())
+
+
+def index_integration_version(args):
+    """Returns the IntegrationVersionIndex entry for one integration ref. args is
+    a (git_dir, refname, sha, ymls) tuple, so that this can be used with
+    Executor.map(). The versions come from the "git" listing, and from the
+    "docker" listing for the ymls which the "git" listing doesn't have."""
+
+    (git_dir, refname, sha, ymls) = args
+
+    data = get_docker_compose_data_for_rev(git_dir, sha, version="git")
+    versions = {yml: info["version"] for yml, info in data.items()}
+    # For pre 2.4.x releases git-versions.*.yml files do not exist hence this
+    # listing would be missing the backend components. Try loading the old
+    # "docker" versions.
+    if any([yml not in versions for yml in ymls]):
+        data = get_docker_compose_data_for_rev(git_dir, sha, version="docker")
+        for yml, info in data.items():
+            versions.setdefault(yml, info["version"])
+
+    return {
+        "sha": sha,
+        "versions": versions,
+        "release_components": get_release_components_for_rev(git_dir, sha),
+    }
+
+
+def do_integration_versions_including(args):
+    if not args.version:
+        print("--integration-versions-including requires --version argument")
+        sys.exit(2)
+
+    try:
+        repo = Component.get_component_of_any_type(args.integration_versions_including)
+    except KeyError:
+        print("Unrecognized repository: %s" % args.integration_versions_including)
+        sys.exit(1)
+
+    git_dir = integration_dir()
+    remote = find_upstream_remote(None, git_dir, "integration")
+    # The below query will match all tags and the following branches: master, staging and releases (N.M.x)
+    git_query = [
+        "for-each-ref",
+        "--format=%(refname:short) %(objectname)",
+        "--sort=-version:refname:short",
+        "refs/tags/*",
+        "refs/remotes/%s/master" % remote,
+        "refs/remotes/%s/staging" % remote,
+        "refs/remotes/%s/[0-9].[0-9].x" % remote,
+        "refs/remotes/%s/[0-9][0-9].[0-9].x" % remote,
+        "refs/remotes/%s/[0-9].[0-9][0-9].x" % remote,
+        "refs/remotes/%s/[0-9][0-9].[0-9][0-9].x" % remote,
+    ]
+    if args.all:
+        git_query += ["refs/heads/**"]
+    if args.feature_branches:
+        git_query += ["refs/remotes/%s/feature-*" % remote]
+    output = execute_git(None, git_dir, git_query, capture=True)
+    candidates = []
+    for line in output.strip().split("\n"):
+        # Filter out build tags.
+        if line == "" or re.search("-build", line):
+            continue
+
+        candidates.append(tuple(line.split()))
+
+    # Bring the index up to date with refs that have been added or moved, and
+    # then look up which ones contain the version of the service we are
+    # querying. Print them in the for-each-ref order.
+    index = IntegrationVersionIndex(git_dir)
+    index.update(
+        candidates,
+        [
+            comp.yml_components()[0].yml()
+            for comp in Component.get_components_of_type("git")
+        ],
+    )
+    including = index.refs_including(repo.yml_components()[0].yml(), args.version)
+    for refname, _ in candidates:
+        if refname in including and is_marked_as_releaseable(
+            index.refs[refname]["release_components"],
+            refname,
+            repo.git(),
+            args.version,
+        ):
+            print(refname)
+
+
+def figure_out_checked_out_revision(state, repo_git):
+    """Finds out what is currently checked out, and returns a list of pairs. The
+    first element is the name of what is checked out, the second is either
+    "branch" or "tag", referring to what is currently checked out. If neither a
+    tag nor branch is checked out, returns None."""
+
+    try:
+        ref = execute_git(
+            None,
+            repo_git,
+            ["symbolic-ref", "--short", "HEAD"],
+            capture=True,
+            capture_stderr=True,
+        )
+        # If the above didn't produce an exception, then we are on a branch.
+        return [(ref, "branch")]
+    except subprocess.CalledProcessError:
+        # Not a branch, fall through to below.
+        pass
+
+    # We are not on a branch. Or maybe we are on a branch, but CI
+    # checked out the SHA anyway.
+    ref = os.environ.get(GIT_TO_BUILDPARAM_MAP[os.path.basename(repo_git)])
+
+    if ref is not None:
+        try:
+            # Make sure it matches the checked out SHA.
+            checked_out_sha = execute_git(
+                None, repo_git, ["rev-parse", "HEAD"], capture=True
+            )
+            remote = find_upstream_remote(None, repo_git)
+            ref_sha = execute_git(
+                None,
+                repo_git,
+                ["rev-parse", "%s/%s" % (remote, ref)],
+                capture=True,
+                capture_stderr=True,
+            )
+            if ref_sha != checked_out_sha:
+                # Why isn't the branch mentioned in the build parameters checked
+                # out? This should not happen.
+                raise Exception(
+                    (
+                        "%s: SHA %s from %s does not match checked out SHA %s. "
+                        + "Although rare, this sometimes happens if a repository is "
+                        + "updated in the very same instant it is pulled. Just restarting "
+                        + "the build should get rid of the problem in most cases."
+                    )
+                    % (repo_git, ref_sha, ref, checked_out_sha)
+                )
+
+            return [(ref, "branch")]
+        except subprocess.CalledProcessError:
+            # Not a branch. Then fall through to part below.
+            pass
+
+    # Not a branch checked out as a SHA either. Try tag then.
+    refs = execute_git(
+        None, repo_git, ["tag", "--points-at", "HEAD"], capture=True
+    ).split()
+    if len(refs) == 0:
+        # We are not on a tag either.
+        return None
+
+    return [(ref, "tag") for ref in refs]
+
+
+def find_repo_path(name, paths):
+    """ Try to find the git repo 'name' under some known paths.
+        Return abspath or None if not found.
+    """
+    for p in paths:
+        path = os.path.normpath(os.path.join(integration_dir(), p, name))
+        if os.path.isdir(path):
+            return path
+
+    return None
+
+
+def do_map_name(args):
+    int_dir = integration_dir()
+    if args.in_integration_version:
+        data = get_docker_compose_data_for_rev(
+            int_dir, args.in_integration_version, version="docker"
+        )
+    else:
+        data = get_docker_compose_data(int_dir, version="docker")
+
+    cli_types = {
+        "container": "docker_container",
+        "docker": "docker_image",
+        "git": "git",
+    }
+    comp = Component.get_component_of_type(
+        cli_types[args.map_name[0]], args.map_name[1]
+    )
+    if args.map_name[2] == "docker_url":
+        to_type = "docker_image"
+    else:
+        to_type = cli_types[args.map_name[2]]
+    for result in comp.associated_components_of_type(to_type):
+        if args.map_name[2] == "docker_url":
+            print("%s/%s" % (data[result.name]["image_prefix"], result.name))
+        else:
+            print(result.name)
+
+
+def get_next_hosted_release_version(state):
+    """Return next tag like "saas-vYYYY.MM.DD" (saas-vYEAR.MONTH.DAY)
+
+    If no tag for the current month exists, returns saas-vYYYY.MM.DD
+    If a tag like saas-vYYYY.MM.DD, returns saas-vYYYY.MM.DD.02
+    If a tag like saas-vYYYY.MM.DD.NN exists, returns saas-vYYYY.MM.DD.(NN+1)
+    """
+    today = datetime.datetime.today()
+    version = "saas-v{y}.{m:02d}.{d:02d}".format(
+        y=today.year, m=today.month, d=today.day
+    )
+
+    highest = 0
+    for repo in Component.get_components_of_type("git"):
+        highest = max(
+            highest, tag_index(state, repo.git()).highest_saas_serial(version)
+        )
+
+    if highest > 0:
+        version += ".{a:02d}".format(a=highest + 1)
+
+    return version
+
+
+def do_hosted_release(version=None):
+    """Carry out the full release flow:
+
+    * Figure out next tag
+    * Create tags in all repos
+    * Update yaml files in integration
+    """
+
+    # Only allowed to be run from stating branch
+    ref = execute_git(
+        None,
+        integration_dir(),
+        ["symbolic-ref", "--short", "HEAD"],
+        capture=True,
+        capture_stderr=True,
+    )
+    if ref != "staging":
+        print(
+            "do_hosted_release can only be called from staging branch; current branch is %s"
+            % ref
+        )
+        sys.exit(2)
+
+    # Recreate state dict for the function helpers
+    state = {}
+    state["integration"] = {}
+    state["integration"]["following"] = "staging"
+
+    reply = ask("Which directory contains all the Git repositories? ")
+    reply = re.sub("~", os.environ["HOME"], reply)
+    state["repo_dir"] = reply
+
+    # Recommend to fetch all tags
+    input = ask(
+        "Do you want to fetch all the latest tags and branches in all repositories (will not change checked-out branch)? "
+    )
+    if input.startswith("Y") or input.startswith("y"):
+        refresh_repos(state)
+
+    # Figure out next version
+    if version is None:
+        version = get_next_hosted_release_version(state)
+        input = ask("Autogenerated version is %s Continue? " % version)
+        if not (input.startswith("Y") or input.startswith("y")):
+            sys.exit(2)
+    else:
+        print("Tagging version " + version)
+    state["version"] = version
+
+    # Client components will not change
+    non_backend_versions = {}
+    for non_backend_comp in Component.get_components_of_type(
+        "git", only_independent_component=True
+    ):
+        yml_component = non_backend_comp.yml_components()[0]
+
+        non_backend_versions[non_backend_comp.git()] = version_of(
+            integration_dir(), yml_component
+        )
+
+    # Figure out Git sha for the tags
+    tags = {}
+    tags["image_tag"] = version
+    for repo in Component.get_components_of_type("git"):
+        tags[repo.git()] = {}
+
+        if repo.git() in non_backend_versions.keys():
+            tags[repo.git()]["already_released"] = True
+            tags[repo.git()]["build_tag"] = non_backend_versions[repo.git()]
+        else:
+            tags[repo.git()]["already_released"] = False
+            tags[repo.git()]["build_tag"] = version
+
+            remote = find_upstream_remote(state, repo.git())
+            sha = execute_git(
+                state,
+                repo.git(),
+                ["rev-parse", "--short", remote + "/staging"],
+                capture=True,
+            )
+            tags[repo.git()]["sha"] = sha
+
+    # Tag and push, same method as for regular releases
+    retval = tag_and_push(state, None, tags, True)
+    if retval is None:
+        return
+
+    # Recommend to merge into staging branch
+    reply = ask('Merge "integration" release tag into version branch (recommended)? ')
+    if reply.startswith("Y") or reply.startswith("y"):
+        merge_release_tag(
+            state, tags, Component.get_component_of_type("git", "integration"),
+        )
+
+    print("Tags for release %s successfully created" % version)
+
+
+def do_verify_integration_references(args, optional_too):
+    int_dir = integration_dir()
+    problem = False
+
+    # integration is not checked, since the current checkout records the
+    # version of that one.
+    repos = [
+        repo
+        for repo in Component.get_components_of_type(
+            "git", only_release=(not optional_too)
+        )
+        if repo.git() != "integration"
+    ]
+
+    repo_paths = []
+    for repo in repos:
+        # Try some common locations.
+        paths = ["..", "../go/src/github.com/mendersoftware"]
+        path = find_repo_path(repo.git(), paths)
+
+        if path is None:
+            print("%s not found. Tried: %s" % (repo.git(), ", ".join(paths)))
+            sys.exit(2)
+
+        repo_paths.append(path)
+
+    # Finding out what is checked out takes a few Git calls per repository,
+    # which can run concurrently.
+    all_revs = map_concurrently(
+        lambda path: figure_out_checked_out_revision(None, path), repo_paths
+    )
+
+    git_data = get_docker_compose_data(int_dir, version="git")
+    docker_data = None
+
+    for repo, revs in zip(repos, all_revs):
+        if revs is None:
+            # Unrecognized checkout. Skip the check then.
+            continue
+
+        if all(
+            [
+                reftype == "branch"
+                and not re.match(r"^([1-9][0-9]*\.[0-9]+\.([0-9]+|x)|master)$", ref)
+                for ref, reftype in revs
+            ]
+        ):
+            # Skip the check if the branch doesn't have a well known name,
+            # either a version (with or without beta and build appendix) or
+            # "master". If it does not have a well known name, then most likely
+            # this is a pull request, and we don't require those to be recorded
+            # in the YAML files.
+            continue
+
+        for yml in repo.yml_components():
+            data = git_data
+            # For pre 2.4.x releases git-versions.*.yml files do not exist hence this listing
+            # would be missing the backend components. Try loading the old "docker" versions.
+            if data.get(yml.yml()) is None:
+                if docker_data is None:
+                    docker_data = get_docker_compose_data(int_dir, version="docker")
+                data = docker_data
+
+            version = data[yml.yml()]["version"]
+
+            if version not in [ref for ref, reftype in revs]:
+                if len(revs) > 1:
+                    checked_out = "(one of '%s')" % "', '".join(
+                        [ref for ref, reftype in revs]
+                    )
+                else:
+                    checked_out = "'%s'" % revs[0][0]
+                print(
+                    "%s: Checked out Git ref %s does not match tag/branch recorded in integration/*.yml: '%s' (from image tag: '%s')"
+                    % (repo.git(), checked_out, version, yml.yml())
+                )
+                problem = True
+
+    if problem:
+        print("\nMake sure all *.yml files contain the correct versions.")
+        sys.exit(1)
+
+
+def is_repo_on_known_branch(path):
+    """Check if we're on the most recent commit in a well known branch, 'master' or
+    a version branch."""
+
+    remote = find_upstream_remote(None, path)
+
+    branches = execute_git(
+        None,
+        path,
+        [
+            "for-each-ref",
+            "--format=%(refname:short)",
+            "--points-at",
+            "HEAD",
+            "refs/remotes/%s/*" % remote,
+            "refs/tags/*",
+        ],
+        capture=True,
+    ).split()
+    return any(
+        [re.search(r"([0-9]+\.[0-9]+\.[0-9x]+|master)$", branch) for branch in branches]
+    )
+
+
+def changed_components():
+    """Returns the names of the release components which are not checked out on
+    a well known branch, in other words the components that are being built."""
+
+    # check all known git components for custom revisions
+    # answers the question what we're actually building
+    paths = ["..", "../go/src/github.com/mendersoftware"]
+
+    repos = Component.get_components_of_type("git", only_release=True)
+    repo_paths = []
+    for repo in repos:
+        path = find_repo_path(repo.git(), paths)
+        if path is None:
+            raise RuntimeError(
+                "cannot find repo {} in any of {}".format(repo.git(), paths)
+            )
+        repo_paths.append(path)
+
+    # The repositories are independent, so check them concurrently.
+    on_known_branch = map_concurrently(is_repo_on_known_branch, repo_paths)
+
+    built_components = set({})
+    for repo, known in zip(repos, on_known_branch):
+        if not known:
+            built_components.add(repo.name)
+    return built_components
+
+
+def test_container_dependencies(int_dir):
+    """Returns a dictionary from the containers of TEST_COMPOSE_FILES in int_dir
+    to the sets of containers which they call, according to the addresses in
+    their environment."""
+
+    Component._initialize_component_maps()
+    known_containers = set(Component.INDEX.by_name["docker_container"])
+    dependencies = {}
+    for entry in TEST_COMPOSE_FILES:
+        filename = os.path.join(int_dir, entry)
+        if not os.path.isfile(filename):
+            continue
+        data = load_yaml_file(filename) or {}
+        for container, cont_info in (data.get("services") or {}).items():
+            environment = cont_info.get("environment") or []
+            if isinstance(environment, dict):
+                environment = [str(value) for value in environment.values()]
+            called = set()
+            for value in environment:
+                called.update(CONTAINER_NAME_REGEX.findall(value))
+            called &= known_containers - {container}
+            dependencies.setdefault(container, set()).update(called)
+    return dependencies
+
+
+def scan_test_module(int_dir, filename):
+    """Parses a Python module of the integration tests, and returns a triple
+    describing what each name defined in it depends on.
+
+    The first element is a dictionary from every name the module defines, to a
+    pair of the containers and TEST_TOOLS which its definition uses directly,
+    and the names which the definition refers to. Containers are used by name
+    or through API URLs in strings, and through the setups of the container
+    factory in TEST_SETUP_CONTAINERS. Tools are used by name. Methods and
+    attributes of classes are defined as "<class>.<name>", and the class
+    statement itself as "<class>.". The second element is a dictionary from
+    every name the module imports from the integration repository, to a pair of
+    the module it is imported from and the name in it, or None if the name is
+    the module itself. The third element is the list of modules imported with
+    "*"."""
+
+    import ast
+
+    with open(filename) as fd:
+        tree = ast.parse(fd.read(), filename)
+
+    Component._initialize_component_maps()
+    known_containers = Component.INDEX.by_name["docker_container"]
+    definitions = {}
+    bindings = {}
+    stars = []
+
+    def module_file(path):
+        for candidate in [path + ".py", os.path.join(path, "__init__.py")]:
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def add_import(node):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split(".")[0] != "testutils":
+                    continue
+                module = module_file(os.path.join(int_dir, *alias.name.split(".")))
+                if module:
+                    bindings[alias.asname or alias.name] = (module, None)
+            return
+        if node.level > 0:
+            base = os.path.dirname(filename)
+            for _ in range(node.level - 1):
+                base = os.path.dirname(base)
+        elif node.module.split(".")[0] == "testutils":
+            base = int_dir
+        else:
+            return
+        path = os.path.join(base, *node.module.split(".")) if node.module else base
+        module = module_file(path)
+        for alias in node.names:
+            if alias.name == "*":
+                if module:
+                    stars.append(module)
+                continue
+            submodule = module_file(os.path.join(path, alias.name))
+            if submodule:
+                bindings[alias.asname or alias.name] = (submodule, None)
+            elif module:
+                bindings[alias.asname or alias.name] = (module, alias.name)
+
+    def dotted_name(node):
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute):
+            base = dotted_name(node.value)
+            return base and "%s.%s" % (base, node.attr)
+        return None
+
+    def scan(nodes, cls=None, members=()):
+        uses = set()
+        refs = set()
+        pending = list(nodes)
+        while pending:
+            node = pending.pop()
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                add_import(node)
+                continue
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                for service in API_URL_REGEX.findall(node.value):
+                    uses.add(API_SERVICE_CONTAINERS.get(service, "mender-%s" % service))
+                uses.update(CONTAINER_NAME_REGEX.findall(node.value))
+                continue
+            if isinstance(node, ast.Attribute):
+                uses |= TEST_SETUP_CONTAINERS.get(node.attr, set())
+            name = dotted_name(node)
+            if name:
+                parts = name.split(".")
+                if cls and parts[0] in ["self", "cls"] and len(parts) > 1:
+                    if parts[1] in members:
+                        refs.add("%s.%s" % (cls, parts[1]))
+                else:
+                    refs.add(name)
+                continue
+            pending += list(ast.iter_child_nodes(node))
+        return (uses & (set(known_containers) | TEST_TOOLS), refs)
+
+    def define(name, scanned):
+        uses, refs = definitions.get(name, (set(), set()))
+        definitions[name] = (uses | scanned[0], refs | scanned[1])
+
+    def function_nodes(node):
+        nodes = node.decorator_list + node.body + [node.args]
+        # The arguments of fixtures are fixtures too.
+        if any(
+            [
+                (dotted_name(getattr(dec, "func", dec)) or "").endswith("fixture")
+                for dec in node.decorator_list
+            ]
+        ):
+            nodes += [ast.Name(id=arg.arg) for arg in node.args.args]
+        return nodes
+
+    def assigned_names(node):
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        names = []
+        for target in targets:
+            for elt in getattr(target, "elts", [target]):
+                if isinstance(elt, ast.Name):
+                    names.append(elt.id)
+        return names
+
+    def define_statements(statements):
+        for node in statements:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                define(node.name, scan(function_nodes(node)))
+            elif isinstance(node, ast.ClassDef):
+                members = {}
+                header = node.bases + node.keywords + node.decorator_list
+                for member in node.body:
+                    if isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        members[member.name] = function_nodes(member)
+                    elif isinstance(member, (ast.Assign, ast.AnnAssign)):
+                        for name in assigned_names(member):
+                            members[name] = [member.value]
+                    else:
+                        header.append(member)
+                define(node.name + ".", scan(header))
+                define(
+                    node.name,
+                    (set(), {"%s.%s" % (node.name, name) for name in members}),
+                )
+                for name, nodes in members.items():
+                    uses, refs = scan(nodes, node.name, members)
+                    define(
+                        "%s.%s" % (node.name, name), (uses, refs | {node.name + "."})
+                    )
+            elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+                names = assigned_names(node)
+                for name in names or [""]:
+                    define(name, scan([node.value] if node.value else []))
+            elif isinstance(node, ast.If):
+                define("", scan([node.test]))
+                define_statements(node.body + node.orelse)
+            elif isinstance(node, ast.Try):
+                define_statements(
+                    node.body
+                    + [stmt for handler in node.handlers for stmt in handler.body]
+                    + node.orelse
+                    + node.finalbody
+                )
+            else:
+                define("", scan([node]))
+
+    define_statements(tree.body)
+    return (definitions, bindings, stars)
+
+
+def fixtures_of_test(node):
+    """Returns the fixtures which a test function or class asks for, either as
+    arguments or with the "usefixtures" marker."""
+
+    fixtures = []
+    if hasattr(node, "args"):
+        fixtures += [arg.arg for arg in node.args.args if arg.arg != "self"]
+    for decorator in node.decorator_list:
+        if (
+            hasattr(decorator, "func")
+            and getattr(decorator.func, "attr", None) == "usefixtures"
+        ):
+            fixtures += [arg.value for arg in decorator.args if hasattr(arg, "value")]
+    return fixtures
+
+
+def build_test_impact_map(int_dir):
+    """Returns a dictionary from the pytest node ID of every integration test,
+    relative to the integration repository, to the set of git components which
+    can affect its outcome.
+
+    The map is made by following the names which each test and its fixtures
+    refer to, through the test modules and the modules they import, and
+    collecting the containers and tools used along the way, see
+    scan_test_module. Tests which use a setup with a Mender client additionally
+    use the client containers of their suite, and all tests use
+    TEST_IMPLICIT_CONTAINERS. Containers in turn use the containers they call,
+    see test_container_dependencies."""
+
+    import ast
+
+    Component._initialize_component_maps()
+
+    scanned = {}
+    real_int_dir = os.path.realpath(int_dir)
+
+    def scan(module):
+        if module not in scanned:
+            if any(
+                [
+                    os.path.relpath(module, real_int_dir).startswith(skipped)
+                    for skipped in TEST_IMPACT_SKIPPED_MODULES
+                ]
+            ):
+                scanned[module] = ({}, {}, [])
+            else:
+                scanned[module] = scan_test_module(int_dir, module)
+        return scanned[module]
+
+    def follow(module, name):
+        """Returns the containers and tools which the name uses directly in the
+        module, and the (module, name) pairs it refers to. A name of None stands
+        for everything in the module."""
+
+        definitions, bindings, stars = scan(module)
+        if name is None:
+            return (set(), [(module, defined) for defined in definitions])
+        parts = name.split(".")
+        for index in range(len(parts), 0, -1):
+            prefix = ".".join(parts[:index])
+            if prefix in definitions:
+                uses, refs = definitions[prefix]
+                return (uses, [(module, ref) for ref in refs])
+            if prefix in bindings:
+                imported, imported_name = bindings[prefix]
+                names = ([imported_name] if imported_name else []) + parts[index:]
+                return (set(), [(os.path.realpath(imported), ".".join(names) or None)])
+        return (set(), [(os.path.realpath(star), name) for star in stars])
+
+    def defines(module, name):
+        definitions, bindings, stars = scan(module)
+        return name in definitions or name in bindings
+
+    def used_containers(roots):
+        containers = set()
+        visited = set()
+        pending = list(roots)
+        while pending:
+            node = pending.pop()
+            if node in visited:
+                continue
+            visited.add(node)
+            used, refs = follow(*node)
+            containers |= used
+            pending += refs
+        return containers
+
+    dependencies = test_container_dependencies(int_dir)
+
+    def git_components(containers):
+        # Containers use the containers they call, recursively.
+        pending = list(containers)
+        containers = set()
+        while pending:
+            container = pending.pop()
+            if container in containers:
+                continue
+            containers.add(container)
+            pending += dependencies.get(container, [])
+
+        components = containers & TEST_TOOLS
+        for container in containers - TEST_TOOLS:
+            components |= TEST_CONTAINER_COMPONENTS.get(container, set())
+            components |= {
+                git.name
+                for git in Component.get_component_of_type(
+                    "docker_container", container
+                ).associated_components_of_type("git")
+            }
+        return components
+
+    impact_map = {}
+    for suite, suite_containers in TEST_SUITES.items():
+        suite_dir = os.path.join(int_dir, suite)
+        if not os.path.isdir(suite_dir):
+            continue
+        # Fixtures which a test module doesn't define or import come from the
+        # conftest.py files of its directory and the directories above it.
+        conftests = []
+        directory = os.path.realpath(suite_dir)
+        while True:
+            conftest = os.path.join(directory, "conftest.py")
+            if os.path.isfile(conftest):
+                conftests.append(conftest)
+            if directory == real_int_dir or directory == "/":
+                break
+            directory = os.path.dirname(directory)
+
+        for entry in sorted(os.listdir(suite_dir)):
+            if not entry.startswith("test_") or not entry.endswith(".py"):
+                continue
+            filename = os.path.realpath(os.path.join(suite_dir, entry))
+            with open(filename) as fd:
+                tree = ast.parse(fd.read(), filename)
+
+            tests = []
+            for node in tree.body:
+                if isinstance(node, ast.ClassDef) and node.name.startswith("Test"):
+                    for method in node.body:
+                        if isinstance(method, ast.FunctionDef):
+                            tests.append(
+                                (
+                                    [node.name, method.name],
+                                    fixtures_of_test(node) + fixtures_of_test(method),
+                                )
+                            )
+                elif isinstance(node, ast.FunctionDef):
+                    tests.append(([node.name], fixtures_of_test(node)))
+
+            for names, fixtures in tests:
+                if not names[-1].startswith("test"):
+                    continue
+                roots = [(filename, ".".join(names))]
+                for fixture in fixtures:
+                    for module in [filename] + conftests:
+                        if defines(module, fixture):
+                            roots.append((module, fixture))
+                            break
+                test_containers = used_containers(roots) | TEST_IMPLICIT_CONTAINERS
+                if not any(
+                    [NO_CLIENT_FIXTURE_REGEX.search(fixture) for fixture in fixtures]
+                ):
+                    test_containers |= suite_containers
+                node_id = "::".join([os.path.join(suite, entry)] + names)
+                impact_map[node_id] = git_components(test_containers)
+
+    return impact_map
+
+
+def select_tests(impact_map, changed):
+    """Returns the pytest node IDs in impact_map of the tests which the changed
+    components can affect. If nothing changed, or if a changed component is not
+    used by any test according to the map, nothing can be ruled out, and all
+    tests are returned."""
+
+    used = set().union(*impact_map.values())
+    if not changed or not changed <= used:
+        return list(impact_map.keys())
+    return [node_id for node_id, comps in impact_map.items() if comps & changed]
+
+
+def select_test_suite():
+    """ Check what backend components are checked out in custom revisions and decide
+        which integration test suite should be ran - 'open', 'enterprise' or both.
+        To be used when running integration tests to see which components 'triggered' the build
+        (i.e. changed, for lack of a better word - could be just 1 service with a checked out PR, or multiple -
+        in case of manually parametrized builds).
+        Rules:
+        - open services, without closed versions, should trigger both setup test runs
+        - open services with closed versions should trigger the 'open' test suite
+        - enterprise services can run just the 'enterprise' setup
+    """
+    built_components = changed_components()
+
+    # seems like we're building plain master of everything - run all tests
+    if len(built_components) == 0:
+        return "all"
+
+    # if we're building only backend services - we can proceed with test selection
+    # if not - assume we must run all test suites (e.g. for mender-cli, etc.)
+    non_service_components = built_components - BACKEND_SERVICES
+    if len(non_service_components) > 0:
+        return "all"
+
+    built_services = BACKEND_SERVICES & built_components
+
+    # count open vs open-enterprise vs enterprise services
+    open_services = built_services & BACKEND_SERVICES_OPEN
+    ent_services = built_services & BACKEND_SERVICES_ENT
+    open_ent_services = built_services & BACKEND_SERVICES_OPEN_ENT
+
+    # open services appear in both setups - run 'all'
+    if len(open_services) > 0:
+        return "all"
+    # only open services with enterprise counterparts - appear only in 'open' setup
+    elif len(ent_services) == 0:
+        return "open"
+    # only enterprise services - just 'enterprise' setup is enough
+    elif len(open_ent_services) == 0:
+        return "enterprise"
+    else:
+        return "all"
+
+
+def do_select_test_suite(args):
+    """Process --select-test-suite argument."""
+
+    if args.node_ids:
+        impact_map = build_test_impact_map(integration_dir())
+        for node_id in select_tests(impact_map, changed_components()):
+            print(node_id)
+    else:
+        print(select_test_suite())
+
+
+def start_tracing(filename):
+    """Enables tracing, and saves the trace to filename, and prints a summary of
+    it to stderr, when the process exits."""
+
+    tracer = Tracer()
+    CONTEXT.tracer = tracer
+
+    @atexit.register
+    def finish_tracing():
+        tracer.write(filename)
+        print(tracer.summary(), file=sys.stderr)
+        print("Trace saved to %s." % filename, file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-g",
+        "--version-of",
+        dest="version_of",
+        metavar="SERVICE",
+        help="Get version of given service",
+    )
+    parser.add_argument(
+        "-t",
+        "--version-type",
+        dest="version_type",
+        metavar="git|docker",
+        default="git",
+        help="Used together with the above to specify the type of version to query.",
+    )
+    parser.add_argument(
+        "-i",
+        "--in-integration-version",
+        dest="in_integration_version",
+        metavar="VERSION",
+        help="Used together with the above argument to query for a version of a "
+        + "service which is in the given version of integration, instead of the "
+        + "currently checked out version of integration. If a range is given here "
+        + "it will return the range of the corresponding service.",
+    )
+    parser.add_argument(
+        "--version-of-batch",
+        dest="version_of_batch",
+        metavar="FILE",
+        help="Answer many --version-of queries at once. FILE (or - for standard "
+        + 'input) contains a JSON list of objects with a "service" key, and '
+        + 'optionally "in_integration_version" and "version_type" keys, which '
+        + "mean the same as the arguments above. The answers are printed as a "
+        + 'JSON list of the same objects, with a "version" key added.',
+    )
+    parser.add_argument(
+        "-s",
+        "--set-version-of",
+        dest="set_version_of",
+        metavar="SERVICE",
+        help="Write version of given service into docker-compose.yml",
+    )
+    parser.add_argument(
+        "-f",
+        "--integration-versions-including",
+        dest="integration_versions_including",
+        metavar="SERVICE",
+        help="Find version(s) of integration repository that contain the given version of SERVICE, "
+        + " where version is given with --version. Returned as a newline separated list",
+    )
+    parser.add_argument(
+        "--feature-branches",
+        action="store_true",
+        default=False,
+        help="When used with -f, include upstream feature branches",
+    )
+    parser.add_argument(
+        "-v",
+        "--version",
+        dest="version",
+        help="Version which is used in above two arguments",
+    )
+    parser.add_argument(
+        "-b",
+        "--build",
+        dest="build",
+        metavar="VERSION",
+        const=True,
+        nargs="?",
+        help="Build the given version of Mender",
+    )
+    parser.add_argument(
+        "-c",
+        "--ci-server",
+        metavar="jenkins|gitlab",
+        dest="ci_server",
+        default="gitlab",
+        nargs="?",
+        help="Select server CI where to trigger the builds. Default is GitLab.",
+    )
+    parser.add_argument(
+        "--pr",
+        dest="pr",
+        metavar="REPO/PR-NUMBER",
+        action="append",
+        help="Can only be used with -b. Specifies a repository and pull request number "
+        + "that should be triggered with the rest of the repository versions. It is "
+        + "also possible to specify a branch name instead of a pull request number. "
+        + "May be specified more than once.",
+    )
+    parser.add_argument(
+        "-l",
+        "--list",
+        metavar="container|docker|git",
+        dest="list",
+        const="git",
+        nargs="?",
+        help="List the Mender repositories in use for this release. The optional "
+        + "argument determines which type of name is returned. The default is git. "
+        + "By default does not list optional repositories.",
+    )
+    parser.add_argument(
+        "-a",
+        "--all",
+        action="store_true",
+        default=False,
+        help="When used with -l, list all repositories, including optional ones. "
+        + "When used with -f, include local branches in addition to upstream branches.",
+    )
+    parser.add_argument(
+        "-m",
+        "--map-name",
+        metavar=("FROM-TYPE", "SERVICE", "TO-TYPE"),
+        dest="map_name",
+        nargs=3,
+        help="Map the SERVICE name from one type to another. FROM-TYPE and TO-TYPE may be git, docker "
+        + "or container. TO-TYPE may additionally be docker_url. May return more than one result.",
+    )
+    parser.add_argument(
+        "--release", action="store_true", help="Start the release process (interactive)"
+    )
+    parser.add_argument(
+        "--release-state",
+        dest="release_state_file",
+        help="State file for releases, default is release-state.yml",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Record how long every Git, Docker, HTTP and other external call "
+        + "takes, and save it to FILE in the Chrome trace event format, which "
+        + "chrome://tracing and https://ui.perfetto.dev can show. A table of the "
+        + "operations that took the most time is printed on exit.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Never download anything over HTTP, such as the build parameters, "
+        + "and use the copies in the on-disk cache instead, however old they are. "
+        + "Copies are normally refreshed after an hour.",
+    )
+    parser.add_argument(
+        "--state-journal",
+        action="store_true",
+        help="Save changes to the state file by appending them to a journal next "
+        + "to it (FILE.journal), instead of rewriting the whole file every time. "
+        + "The journal is folded into the state file when it grows large, and "
+        + "when the tool exits.",
+    )
+    parser.add_argument(
+        "--hosted-release",
+        action="store_true",
+        help="Tag versions from staging for production release. "
+        + "If --version is not suplied, the tags will be 'saas-v<YYYY>.<MM>.<DD>'",
+    )
+    parser.add_argument(
+        "--simulate-push", action="store_true", help="Simulate (don't do) pushes"
+    )
+    parser.add_argument(
+        "--select-test-suite",
+        action="store_true",
+        help="Based on checked out git revisions, decide which integration suite must run ('open', 'enterprise', 'all').",
+    )
+    parser.add_argument(
+        "--node-ids",
+        action="store_true",
+        help="Used together with --select-test-suite to print the pytest node IDs "
+        + "of the tests affected by the checked out git revisions instead, one per "
+        + "line and relative to the integration repository.",
+    )
+    parser.add_argument(
+        "-n", "--dry-run", action="store_true", help="Don't take any action at all"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help=(
+            "Number of commands to run at the same time in operations that "
+            + "support it, such as fetching all repositories. Default is %d. Git "
+            + "pushes, which may ask for credentials, only run concurrently if "
+            + "this is given."
+        )
+        % DEFAULT_JOBS,
+    )
+    parser.add_argument(
+        "--verify-integration-references",
+        action="store_true",
+        help="Checks that references in the yaml files match the tags that "
+        + "are checked out in Git. This is intended to catch cases where "
+        + "references to images or tools are out of date. It requires checked-out "
+        + "repositories to exist next to the integration repository, and is "
+        + "usually used only in builds. For branch names (not tags), only "
+        + 'well known names are checked: version numbers and "master" (to avoid '
+        + "pull requests triggering a failure). Respects -a argument.",
+    )
+    args = parser.parse_args()
+
+    # Check conflicting options.
+    operations = 0
+    for operation in [
+        args.version_of,
+        args.version_of_batch,
+        args.release,
+        args.set_version_of,
+    ]:
+        if operation:
+            operations = operations + 1
+    if operations > 1:
+        print(
+            "--version-of, --version-of-batch, --set-version-of and --release are "
+            + "mutually exclusive!"
+        )
+        sys.exit(1)
+
+    # Check conflicting options.
+    operations = 0
+    for operation in [args.release, args.hosted_release]:
+        if operation:
+            operations = operations + 1
+    if operations > 1:
+        print("--release and --hosted-release are mutually exclusive!")
+        sys.exit(1)
+
+    if args.simulate_push:
+        CONTEXT.push = False
+    if args.dry_run:
+        CONTEXT.dry_run = True
+    if args.jobs is not None:
+        CONTEXT.jobs = args.jobs
+        CONTEXT.concurrent_pushes = True
+    CONTEXT.state_journal = args.state_journal
+    CONTEXT.offline = args.offline
+    if args.trace:
+        start_tracing(args.trace)
+    assert args.ci_server in ["jenkins", "gitlab"], (
+        "%s is not a valid CI server!" % args.ci_server
+    )
+    if args.ci_server == "jenkins":
+        CONTEXT.use_gitlab = False
+
+    if args.version_of is not None:
+        do_version_of(args)
+    elif args.version_of_batch is not None:
+        do_version_of_batch(args)
+    elif args.list is not None:
+        do_list_repos(args, optional_too=args.all)
+    elif args.set_version_of is not None:
+        do_set_version_to(args)
+    elif args.integration_versions_including is not None:
+        do_integration_versions_including(args)
+    elif args.build:
+        do_build(args)
+    elif args.map_name:
+        do_map_name(args)
+    elif args.release:
+        release_state_file = "release-state.yml"
+        if args.release_state_file:
+            release_state_file = args.release_state_file
+        do_release(release_state_file)
+    elif args.hosted_release:
+        do_hosted_release(args.version)
+    elif args.verify_integration_references:
+        do_verify_integration_references(args, optional_too=args.all)
+    elif args.select_test_suite:
+        do_select_test_suite(args)
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
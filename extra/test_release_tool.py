@@ -12,16 +12,46 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import json
 import os
+import pickle
 import sys
 import shutil
 import re
+import subprocess
 from unittest.mock import patch
 
 import pytest
 
-from release_tool import main
-from release_tool import docker_compose_files_list
+import release_tool_lib
+from release_tool_lib import main
+from release_tool_lib import Component
+from release_tool_lib import docker_compose_files_list
+from release_tool_lib import get_docker_compose_data_for_rev
+from release_tool_lib import git_object_reader
+from release_tool_lib import IntegrationVersionIndex
+from release_tool_lib import execute_chains_concurrently
+from release_tool_lib import execute_concurrently
+from release_tool_lib import GitRunner
+from release_tool_lib import ReleaseToolContext
+from release_tool_lib import TagIndex
+from release_tool_lib import tag_index
+from release_tool_lib import execute_git
+from release_tool_lib import setup_temp_git_checkout
+from release_tool_lib import closest_ref
+from release_tool_lib import load_yaml_file
+from release_tool_lib import load_state
+from release_tool_lib import update_state
+from release_tool_lib import state_transaction
+from release_tool_lib import flush_state_journal
+from release_tool_lib import set_docker_compose_versions_to
+from release_tool_lib import query_execute_list
+from release_tool_lib import query_execute_git_list
+from release_tool_lib import find_upstream_remote
+from release_tool_lib import build_test_impact_map
+from release_tool_lib import select_tests
+from release_tool_lib import http_get_cached
+from release_tool_lib import Tracer
 
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 RELEASE_TOOL = os.path.join(THIS_DIR, "release_tool.py")
@@ -172,6 +202,54 @@ def test_version_of(capsys):
     )
 
 
+def test_component_index():
+    deviceauth = Component.get_component_of_type("git", "deviceauth")
+    assert deviceauth is Component("deviceauth", "git")
+    assert pickle.loads(pickle.dumps(deviceauth)) is deviceauth
+    with pytest.raises(AttributeError):
+        deviceauth.type = "yml"
+
+    # yml_components() must not change the components it is derived from.
+    image = Component.get_component_of_type("docker_image", "deviceauth")
+    assert image.yml_components() == [Component("deviceauth", "yml")]
+    assert image.type == "docker_image"
+
+    repos = Component.get_components_of_type("git")
+    assert [repo.git() for repo in repos] == sorted(repo.git() for repo in repos)
+    assert deviceauth in repos
+    assert deviceauth.is_release_component()
+    assert not deviceauth.is_independent_component()
+    assert Component("integration", "git").is_independent_component()
+    assert Component.get_components_of_type("git", only_independent_component=True) == [
+        repo for repo in repos if repo.is_independent_component()
+    ]
+    non_release = Component.get_components_of_type("git", only_non_release=True)
+    assert len(non_release) > 0
+    assert not set(non_release) & set(repos)
+
+
+def test_version_of_batch(capsys, tmp_path):
+    queries = [
+        {"service": "deviceauth"},
+        {"service": "deviceauth", "version_type": "docker"},
+        {"service": "mender", "version_type": "git"},
+    ]
+    filename = tmp_path / "queries.json"
+    with open(filename, "w") as fd:
+        json.dump(queries, fd)
+    output = run_main_assert_result(capsys, ["--version-of-batch", str(filename)])
+    assert [result["version"] for result in json.loads(output)] == [
+        "master",
+        "mender-master",
+        "master",
+    ]
+    assert [result["service"] for result in json.loads(output)] == [
+        "deviceauth",
+        "deviceauth",
+        "mender",
+    ]
+
+
 def test_version_of_with_in_integration_version(capsys):
     # In remote master, shall be master
     run_main_assert_result(
@@ -353,3 +431,763 @@ def test_docker_compose_files_list():
     assert "git-versions-enterprise.yml" not in list_docker_filenames
     assert "docker-compose.yml" in list_docker_filenames
     assert "docker-compose.enterprise.yml" in list_docker_filenames
+
+
+@pytest.fixture(scope="function")
+def compose_repo(tmp_path, monkeypatch):
+    """A minimal Git repository with a single docker-compose file, and a
+    private on-disk cache."""
+
+    monkeypatch.setenv("RELEASE_TOOL_CACHE_DIR", str(tmp_path / "cache"))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    with open(repo / "docker-compose.yml", "w") as fd:
+        fd.write(
+            """services:
+    mender-deviceauth:
+        image: mendersoftware/deviceauth:1.2.3
+"""
+        )
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.check_call(git + ["init", "-q"], cwd=repo)
+    subprocess.check_call(git + ["add", "."], cwd=repo)
+    subprocess.check_call(git + ["commit", "-q", "-m", "Initial"], cwd=repo)
+    return str(repo)
+
+
+def test_docker_compose_data_for_rev_cache(compose_repo):
+    expected = {
+        "deviceauth": {
+            "container": "mender-deviceauth",
+            "image_prefix": "mendersoftware",
+            "version": "1.2.3",
+        }
+    }
+    context = ReleaseToolContext()
+    assert (
+        get_docker_compose_data_for_rev(compose_repo, "HEAD", "docker", context)
+        == expected
+    )
+    assert list(context.compose_data_by_tree.values()) == [expected]
+
+    # Second lookup must be served from the cache, without parsing anything.
+    with patch.object(
+        release_tool_lib,
+        "get_docker_compose_data_from_json_list",
+        side_effect=AssertionError("cache not used"),
+    ):
+        assert (
+            get_docker_compose_data_for_rev(compose_repo, "HEAD", "docker") == expected
+        )
+
+
+def test_git_object_reader(compose_repo):
+    reader = git_object_reader(compose_repo)
+    content = reader.read_file("HEAD", "docker-compose.yml")
+    assert "mendersoftware/deviceauth:1.2.3" in content
+    assert reader.read_file("HEAD", "nonexistent.yml") is None
+    assert reader.read("nonexistent-rev^{tree}") is None
+
+    # All lookups go through the same process.
+    pid = reader.proc.pid
+    (sha, type, content) = reader.read("HEAD^{tree}")
+    assert type == "tree"
+    assert [name for _, name, _ in reader.parse_tree(sha, content)] == [
+        "docker-compose.yml"
+    ]
+    assert reader.proc.pid == pid
+    assert git_object_reader(compose_repo) is reader
+
+    # Each context has readers of its own.
+    context = ReleaseToolContext()
+    assert git_object_reader(compose_repo, context) is not reader
+    assert git_object_reader(compose_repo, context).read("HEAD^{tree}")[0] == sha
+
+
+def test_integration_version_index(compose_repo):
+    sha = (
+        subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=compose_repo)
+        .decode()
+        .strip()
+    )
+
+    # Like before 2.4.x, there are no git-versions files, so the version comes
+    # from the docker listing.
+    index = IntegrationVersionIndex(compose_repo)
+    index.update([("1.0.0", sha)], ["deviceauth"])
+    assert index.refs_including("deviceauth", "1.2.3") == {"1.0.0"}
+    assert index.refs_including("deviceauth", "4.5.6") == set()
+    # No component-maps.yml in this repository.
+    assert index.refs["1.0.0"]["release_components"] is None
+
+    # A fresh instance loads the index from disk, and doesn't look at refs that
+    # haven't changed.
+    index = IntegrationVersionIndex(compose_repo)
+    with patch.object(
+        release_tool_lib,
+        "index_integration_version",
+        side_effect=AssertionError("index not used"),
+    ):
+        index.update([("1.0.0", sha)], ["deviceauth"])
+    assert index.refs_including("deviceauth", "1.2.3") == {"1.0.0"}
+
+    # The docker listing is not read when the git listing has all components,
+    # here it would fail.
+    with open(os.path.join(compose_repo, "git-versions.yml"), "w") as fd:
+        fd.write(
+            """services:
+    mender-deviceauth:
+        image: mendersoftware/deviceauth:2.0.0
+"""
+        )
+    with open(os.path.join(compose_repo, "docker-compose.yml"), "a") as fd:
+        fd.write(
+            """    mender-deviceauth-2:
+        image: mendersoftware/deviceauth:1.2.3
+"""
+        )
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.check_call(git + ["add", "."], cwd=compose_repo)
+    subprocess.check_call(git + ["commit", "-q", "-m", "2.0.0"], cwd=compose_repo)
+    sha2 = (
+        subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=compose_repo)
+        .decode()
+        .strip()
+    )
+    index.update([("1.0.0", sha), ("2.0.0", sha2)], ["deviceauth"])
+    assert index.refs_including("deviceauth", "2.0.0") == {"2.0.0"}
+
+    # Refs which are gone are forgotten, also on disk.
+    index.update([("2.0.0", sha2)], ["deviceauth"])
+    assert index.refs_including("deviceauth", "1.2.3") == set()
+    assert list(IntegrationVersionIndex(compose_repo).refs.keys()) == ["2.0.0"]
+
+
+def test_execute_concurrently(capsys):
+    attempts = {"flaky": 0, "broken": 0}
+
+    def flaky():
+        attempts["flaky"] += 1
+        if attempts["flaky"] < 3:
+            raise subprocess.CalledProcessError(1, ["git", "fetch"])
+
+    def broken():
+        attempts["broken"] += 1
+        raise subprocess.CalledProcessError(1, ["git", "fetch"], output=b"no route")
+
+    with patch("time.sleep") as sleep:
+        execute_concurrently([("flaky", flaky)], retries=3)
+        assert attempts["flaky"] == 3
+        # Exponential backoff.
+        delays = [call.args[0] for call in sleep.call_args_list]
+        assert delays == [
+            release_tool_lib.RETRY_DELAY,
+            release_tool_lib.RETRY_DELAY * 2,
+        ]
+
+        with pytest.raises(subprocess.CalledProcessError):
+            execute_concurrently([("flaky", flaky), ("broken", broken)], retries=1)
+        assert attempts["broken"] == 2
+
+    output = capsys.readouterr().out
+    assert "broken: FAILED" in output
+    assert "no route" in output
+
+
+def test_execute_chains_concurrently(capsys):
+    steps = []
+
+    def step(name, fail=False):
+        def function():
+            steps.append(name)
+            if fail:
+                raise subprocess.CalledProcessError(1, ["docker", "push"])
+
+        return (name, function)
+
+    with pytest.raises(subprocess.CalledProcessError):
+        execute_chains_concurrently(
+            [
+                [step("a pull"), step("a tag"), step("a push")],
+                [step("b pull"), step("b tag", fail=True), step("b push")],
+            ]
+        )
+    assert [name for name in steps if name.startswith("a")] == [
+        "a pull",
+        "a tag",
+        "a push",
+    ]
+    # The rest of a failed chain is skipped.
+    assert [name for name in steps if name.startswith("b")] == ["b pull", "b tag"]
+    output = capsys.readouterr().out
+    assert re.search(r"^b push +0\.0s +0 skipped$", output, re.MULTILINE)
+
+
+def test_query_execute_list_concurrent(capsys):
+    image = "registry.mender.io:5000/mendersoftware/deviceauth"
+    execute_list = [
+        ["docker", "pull", image + ":1.0.0"],
+        ["docker", "tag", image + ":1.0.0", image + ":latest"],
+        ["docker", "push", image + ":latest"],
+    ]
+    context = release_tool_lib.CONTEXT
+    with patch("release_tool_lib.ask", return_value="y"), patch.object(
+        context, "dry_run", True
+    ), patch("subprocess.check_output") as check_output:
+        assert query_execute_list(execute_list, concurrent=True)
+    # Only the pull has no side effects, the others are simulated.
+    check_output.assert_called_once_with(execute_list[0], stderr=subprocess.STDOUT)
+    output = capsys.readouterr().out
+    assert "Would have executed: docker push %s:latest" % image in output
+    assert "3 tasks finished" in output
+
+
+def test_query_execute_git_list_then_concurrently(compose_repo):
+    tag = (None, compose_repo, ["tag", "-a", "-m", "1.0.0", "1.0.0", "HEAD"])
+    push = (None, compose_repo, ["push", "origin", "1.0.0"])
+    failing_tag = (None, compose_repo, ["tag", "-a", "-m", "2.0.0", "2.0.0", "nope"])
+
+    # All tags are created, in order, before any push.
+    with patch("release_tool_lib.ask", return_value="y"), patch(
+        "release_tool_lib.execute_git"
+    ) as execute_git_mock:
+        assert query_execute_git_list(
+            [tag, tag], then_concurrently=[push, push], then_retries=3
+        )
+    assert [call.args[2][0] for call in execute_git_mock.call_args_list] == [
+        "tag",
+        "tag",
+        "push",
+        "push",
+    ]
+
+    # A tag that fails is not retried, and nothing is pushed.
+    with patch("release_tool_lib.ask", return_value="y"), patch(
+        "release_tool_lib.execute_git",
+        side_effect=subprocess.CalledProcessError(1, "git tag"),
+    ) as execute_git_mock:
+        with pytest.raises(subprocess.CalledProcessError):
+            query_execute_git_list(
+                [failing_tag, tag], then_concurrently=[push], then_retries=3
+            )
+    assert execute_git_mock.call_count == 1
+
+
+def test_git_runner(compose_repo, capsys):
+    context = ReleaseToolContext()
+    runner = GitRunner(context)
+    assert runner.git_dir(compose_repo) == os.path.join(compose_repo, ".git")
+    toplevel = runner.run(compose_repo, ["rev-parse", "--show-toplevel"], capture=True)
+    assert toplevel == compose_repo
+
+    with pytest.raises(subprocess.CalledProcessError):
+        runner.run(compose_repo, ["rev-parse", "nonexistent"], capture=True)
+    head = runner.run(compose_repo, ["rev-parse", "HEAD"], capture=True)
+    assert (
+        runner.run(compose_repo, ["rev-list", "--stdin"], capture=True, input="HEAD\n")
+        == head
+    )
+
+    context.dry_run = True
+    assert runner.run(compose_repo, ["tag", "should-not-exist"]) is None
+    context.dry_run = False
+    assert "Would have executed" in capsys.readouterr().out
+    assert runner.run(compose_repo, ["tag"], capture=True) == ""
+
+
+def test_tag_index(compose_repo):
+    tags = TagIndex(
+        {
+            tag: "0" * 40
+            for tag in [
+                "2.9.0",
+                "2.10.0b1",
+                "2.10.0",
+                "2.10.0-build1",
+                "2.10.0-build12",
+                "2.10.0-build2",
+                "100.0.0",
+                "saas-v2021.05.20",
+                "saas-v2021.05.20.03",
+                "some-branch-tag",
+            ]
+        }
+    )
+    assert tags.final_versions() == ["100.0.0", "2.10.0", "2.10.0b1", "2.9.0"]
+    assert tags.prev_version("2.10.0") == "2.10.0b1"
+    assert tags.prev_version("2.10.0b1") == "2.9.0"
+    assert tags.prev_version("2.10.1") == "2.10.0"
+    assert tags.prev_version("2.9.0") is None
+    assert tags.prev_version("special") is None
+    assert tags.next_version("2.10.0") == "100.0.0"
+    assert tags.highest_build("2.10.0") == (12, "2.10.0-build12")
+    assert tags.highest_build("2.9.0") is None
+    assert tags.build_tags("2.10.0") == [
+        "2.10.0-build1",
+        "2.10.0-build2",
+        "2.10.0-build12",
+    ]
+    assert tags.highest_saas_serial("saas-v2021.05.20") == 3
+    assert tags.highest_saas_serial("saas-v2021.05.21") == 0
+
+    # Tagging through execute_git() drops the stale index of its context, but
+    # not those of other contexts.
+    context = ReleaseToolContext()
+    other_context = ReleaseToolContext()
+    assert not tag_index(None, compose_repo, context).has("1.0.0")
+    assert not tag_index(None, compose_repo, other_context).has("1.0.0")
+    execute_git(None, compose_repo, ["tag", "1.0.0"], context=context)
+    assert tag_index(None, compose_repo, context).has("1.0.0")
+    assert not tag_index(None, compose_repo, other_context).has("1.0.0")
+
+
+def test_setup_temp_git_checkout(compose_repo):
+    subprocess.check_call(["git", "tag", "1.2.3"], cwd=compose_repo)
+    state = {"repo_dir": os.path.dirname(compose_repo)}
+    tmpdir = setup_temp_git_checkout(state, "repo", "1.2.3")
+    assert os.path.exists(os.path.join(tmpdir, "docker-compose.yml"))
+    # Objects are borrowed from the original repository, not copied.
+    with open(os.path.join(tmpdir, ".git", "objects", "info", "alternates")) as fd:
+        alternate = fd.read().strip()
+    assert alternate == os.path.realpath(os.path.join(compose_repo, ".git", "objects"))
+    assert os.listdir(os.path.join(tmpdir, ".git", "objects", "pack")) == []
+
+
+def test_setup_temp_git_checkout_dry_run(compose_repo, tmp_path):
+    # The checkout directory is inside another repository, which a dry run
+    # must leave alone.
+    subprocess.check_call(["git", "init", "-q"], cwd=tmp_path)
+    state = {"repo_dir": str(tmp_path)}
+    with patch.object(release_tool_lib.CONTEXT, "dry_run", True):
+        setup_temp_git_checkout(state, "repo", "master")
+    assert not os.path.exists(tmp_path / ".git" / "objects" / "info" / "alternates")
+
+
+def test_closest_ref(compose_repo):
+    def git(*args):
+        subprocess.check_call(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+            + list(args),
+            cwd=compose_repo,
+        )
+
+    git("tag", "-a", "-m", "1.0.0", "1.0.0")
+    git("checkout", "-q", "-b", "feature")
+    git("commit", "-q", "--allow-empty", "-m", "Feature")
+    git("tag", "1.1.0b1")
+    git("checkout", "-q", "-")
+    git("branch", "-q", "-m", "work")
+    git("commit", "-q", "--allow-empty", "-m", "Work")
+    git("commit", "-q", "--allow-empty", "-m", "More work")
+    git("checkout", "-q", "--detach")
+    git("branch", "-q", "-D", "work")
+
+    # Both 1.0.0 and the feature branch are two commits away, ties are broken
+    # by name.
+    assert closest_ref(compose_repo) == "1.0.0"
+    git("checkout", "-q", "1.1.0b1")
+    assert closest_ref(compose_repo) == "1.1.0b1"
+    git("commit", "-q", "--allow-empty", "-m", "Fix")
+    assert closest_ref(compose_repo) == "1.1.0b1"
+    git("merge", "-q", "--no-edit", "1.0.0")
+    assert closest_ref(compose_repo) == "1.1.0b1"
+
+
+def test_find_upstream_remote(compose_repo):
+    subprocess.check_call(
+        ["git", "remote", "add", "upstream", "git@github.com:mendersoftware/repo.git"],
+        cwd=compose_repo,
+    )
+    assert find_upstream_remote(None, compose_repo) == "upstream"
+
+    # The answer is remembered, so Git is not asked again.
+    with patch(
+        "release_tool_lib.execute_git", side_effect=AssertionError("git called")
+    ):
+        assert find_upstream_remote(None, compose_repo) == "upstream"
+
+    with pytest.raises(Exception, match="Could not find git remote"):
+        find_upstream_remote(None, compose_repo, repo_name="deviceauth")
+
+
+def test_test_impact_map(tmp_path):
+    files = {
+        "docker-compose.yml": """
+services:
+    mender-device-auth:
+        environment:
+            DEVICEAUTH_ORCHESTRATOR_ADDR: http://mender-workflows-server:8080/
+""",
+        "testutils/__init__.py": "",
+        "testutils/api/__init__.py": "",
+        "testutils/api/deployments.py": 'URL = "/api/management/v1/deployments"\n',
+        "testutils/api/deviceconfig.py": 'URL = "/api/management/v1/deviceconfig"\n',
+        "testutils/common.py": """
+import testutils.api.deployments as deployments
+import testutils.api.deviceconfig as deviceconfig
+
+
+def upload_artifact():
+    return deployments.URL, "mender-artifact write"
+
+
+def get_config():
+    return deviceconfig.URL
+""",
+        "testutils/infra/container_manager/__init__.py": 'CLIENT = "mender-client"\n',
+        "backend-tests/tests/test_config.py": """
+from testutils.common import get_config
+import testutils.infra.container_manager
+
+
+def test_config():
+    get_config()
+
+
+class TestAuth:
+    def test_login(self):
+        self.helper()
+
+    def helper(self):
+        host = "mender-device-auth:8080"
+
+    def unused(self):
+        return testutils.infra.container_manager.CLIENT
+""",
+        "tests/conftest.py": """
+import pytest
+from testutils.common import upload_artifact
+
+
+@pytest.fixture
+def standard_setup_one_client():
+    upload_artifact()
+""",
+        "tests/common_setup.py": """
+import pytest
+from testutils.infra.container_manager import factory
+
+container_factory = factory.get_factory()
+
+
+@pytest.fixture
+def enterprise_no_client():
+    return container_factory.getEnterpriseSetup()
+""",
+        "tests/tests/test_update.py": """
+import pytest
+from ..common_setup import enterprise_no_client
+
+
+def test_update(standard_setup_one_client):
+    pass
+
+
+@pytest.mark.usefixtures("enterprise_no_client")
+class TestNoClient:
+    def test_nothing(self):
+        pass
+""",
+    }
+    for name, content in files.items():
+        os.makedirs(os.path.dirname(tmp_path / name), exist_ok=True)
+        with open(tmp_path / name, "w") as fd:
+            fd.write(content)
+
+    with patch.object(sys, "argv", [RELEASE_TOOL]):
+        impact_map = build_test_impact_map(str(tmp_path))
+    # Only the definitions which a test and its fixtures reach count, and every
+    # test uses the gateway.
+    assert impact_map == {
+        "backend-tests/tests/test_config.py::test_config": {
+            "deviceconfig",
+            "mender-api-gateway-docker",
+        },
+        "backend-tests/tests/test_config.py::TestAuth::test_login": {
+            "deviceauth",
+            "mender-api-gateway-docker",
+            "workflows",
+            "workflows-enterprise",
+        },
+        "tests/tests/test_update.py::test_update": {
+            "deployments",
+            "deployments-enterprise",
+            "mender",
+            "mender-api-gateway-docker",
+            "mender-artifact",
+            "mender-connect",
+        },
+        "tests/tests/test_update.py::TestNoClient::test_nothing": {
+            "auditlogs",
+            "mender-api-gateway-docker",
+            "tenantadm",
+        },
+    }
+
+    assert select_tests(impact_map, {"deployments"}) == [
+        "tests/tests/test_update.py::test_update"
+    ]
+    assert select_tests(impact_map, {"workflows"}) == [
+        "backend-tests/tests/test_config.py::TestAuth::test_login"
+    ]
+    assert select_tests(impact_map, {"tenantadm"}) == [
+        "tests/tests/test_update.py::TestNoClient::test_nothing"
+    ]
+    assert select_tests(impact_map, {"mender-connect", "deviceconfig"}) == [
+        "backend-tests/tests/test_config.py::test_config",
+        "tests/tests/test_update.py::test_update",
+    ]
+    # The gateway is used by every test.
+    assert len(select_tests(impact_map, {"mender-api-gateway-docker"})) == 4
+    # Nothing is known about mender-cli, so it may affect any test.
+    assert len(select_tests(impact_map, {"deviceconfig", "mender-cli"})) == 4
+    assert len(select_tests(impact_map, set())) == 4
+
+
+def test_test_impact_map_of_gateway():
+    with patch.object(sys, "argv", [RELEASE_TOOL]):
+        impact_map = build_test_impact_map(INTEGRATION_DIR)
+    selected = select_tests(impact_map, {"mender-api-gateway-docker"})
+    assert selected == list(impact_map.keys())
+    for node_id in [
+        "tests/tests/test_basic_integration.py::TestBasicIntegration::test_update_jwt_expired",
+        "tests/tests/test_basic_integration.py::TestBasicIntegration::test_forced_update_check_from_client",
+        "tests/tests/test_bootstrapping.py::TestBootstrapping::test_bootstrap",
+        "tests/tests/test_db_migration.py::TestDBMigration::test_migrate_from_legacy_mender_v1_success",
+    ]:
+        assert node_id in selected
+
+    # Tests which only use other services are left out for a core service.
+    selected = select_tests(impact_map, {"inventory"})
+    assert 0 < len(selected) < len(impact_map)
+    assert (
+        "backend-tests/tests/test_inventory.py::TestGetDevices::test_get_devices_ok"
+        in selected
+    )
+    assert not [node_id for node_id in selected if "test_tenantadm.py" in node_id]
+
+
+def test_http_get_cached(tmp_path, monkeypatch):
+    pytest.importorskip("requests")
+    import http.server
+    import threading
+
+    monkeypatch.setenv("RELEASE_TOOL_CACHE_DIR", str(tmp_path))
+    body = "variables:\n  BUILD_CLIENT: 'true'\n"
+    requests_seen = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d/.gitlab-ci.yml" % server.server_port
+    try:
+        assert http_get_cached(url) == body
+        # Fresh copies are used without asking the server.
+        assert http_get_cached(url) == body
+        assert requests_seen == [None]
+        # Old copies are revalidated.
+        assert http_get_cached(url, ttl=0) == body
+        assert requests_seen == [None, '"v1"']
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Without the server, the old copy is better than nothing.
+    assert http_get_cached(url, ttl=0) == body
+    context = ReleaseToolContext()
+    context.offline = True
+    assert http_get_cached(url, ttl=0, context=context) == body
+    with pytest.raises(Exception, match="offline mode"):
+        http_get_cached(url + "?uncached", context=context)
+
+
+def test_tracer(compose_repo, tmp_path):
+    tracer = Tracer()
+    context = ReleaseToolContext()
+    context.tracer = tracer
+    execute_git(
+        None, compose_repo, ["rev-parse", "HEAD"], capture=True, context=context
+    )
+    with pytest.raises(subprocess.CalledProcessError):
+        execute_git(
+            None,
+            compose_repo,
+            ["rev-parse", "missing"],
+            capture_stderr=True,
+            context=context,
+        )
+    # Other contexts are not traced.
+    execute_git(None, compose_repo, ["rev-parse", "HEAD"], capture=True)
+
+    trace_file = str(tmp_path / "trace.json")
+    tracer.write(trace_file)
+    with open(trace_file) as fd:
+        events = json.load(fd)["traceEvents"]
+    assert events[0]["name"] == "release_tool"
+    commands = [
+        (event["args"]["command"], event["args"]["exit_status"])
+        for event in events
+        if event["args"].get("command")
+    ]
+    assert commands == [("rev-parse HEAD", 0), ("rev-parse missing", 128)]
+    assert all([event["ph"] == "X" and event["dur"] >= 0 for event in events])
+
+    summary = tracer.summary().split("\n")
+    assert summary[0].split() == ["OPERATION", "COUNT", "TOTAL", "SLOWEST"]
+    assert summary[1].startswith("git rev-parse ")
+
+
+def test_load_yaml_file(compose_repo):
+    filename = os.path.join(compose_repo, "docker-compose.yml")
+    expected = {
+        "services": {"mender-deviceauth": {"image": "mendersoftware/deviceauth:1.2.3"}}
+    }
+    assert load_yaml_file(filename) == expected
+
+    # Unchanged files are served from the cache, without parsing anything.
+    with patch.object(
+        release_tool_lib, "load_yaml", side_effect=AssertionError("cache not used")
+    ):
+        assert load_yaml_file(filename) == expected
+
+    with open(filename, "a") as fd:
+        fd.write("        ports: [80]\n")
+    expected["services"]["mender-deviceauth"]["ports"] = [80]
+    assert load_yaml_file(filename) == expected
+
+
+def test_state_file(tmp_path):
+    state_file = str(tmp_path / "release-state.yml")
+    context = ReleaseToolContext()
+    state = load_state(state_file, context)
+    assert state == {}
+
+    with patch.object(
+        release_tool_lib, "save_state", wraps=release_tool_lib.save_state
+    ) as save_state:
+        with state_transaction(state, context):
+            update_state(state, ["version"], "2.6.0", context)
+            update_state(state, ["deviceauth", "version"], "2.5.0", context)
+            assert not os.path.exists(state_file)
+        assert save_state.call_count == 1
+    assert load_state(state_file, context) == state
+
+    # With the journal, updates are appended to it, and loading the state
+    # replays them.
+    context.state_journal = True
+    update_state(state, ["deviceauth", "following"], "origin/2.5.x", context)
+    update_state(state, ["version"], "2.6.1", context)
+    with open(state_file + ".journal") as fd:
+        assert len(fd.readlines()) == 2
+    assert load_state(state_file, context) == {
+        "version": "2.6.1",
+        "deviceauth": {"version": "2.5.0", "following": "origin/2.5.x"},
+    }
+    # Loading folded the journal into the state file.
+    assert not os.path.exists(state_file + ".journal")
+
+    state = load_state(state_file, context)
+    update_state(state, ["version"], "2.6.2", context)
+    flush_state_journal(context)
+    assert not os.path.exists(state_file + ".journal")
+    assert load_state(state_file, context)["version"] == "2.6.2"
+    assert os.listdir(str(tmp_path)) == ["release-state.yml"]
+    # The state file of the default context was not touched.
+    assert release_tool_lib.CONTEXT.state_file != state_file
+
+
+def test_save_state_keeps_symlink_and_mode(tmp_path):
+    target = str(tmp_path / "release-state.yml")
+    state_file = str(tmp_path / "link.yml")
+    with open(target, "w") as fd:
+        fd.write("version: 2.6.0\n")
+    os.chmod(target, 0o640)
+    os.symlink("release-state.yml", state_file)
+
+    context = ReleaseToolContext()
+    state = load_state(state_file, context)
+    update_state(state, ["version"], "2.6.1", context)
+
+    assert os.readlink(state_file) == "release-state.yml"
+    assert os.stat(target).st_mode & 0o777 == 0o640
+    assert load_state(target, context) == {"version": "2.6.1"}
+
+
+def test_set_docker_compose_versions_to(tmp_path):
+    with open(tmp_path / "docker-compose.yml", "w") as fd:
+        fd.write(
+            """services:
+    mender-deployments:
+        image: mendersoftware/deployments:mender-master
+    mender-deployments-enterprise:
+        image: registry.mender.io/mendersoftware/deployments-enterprise:mender-master
+    mender-client:
+        image: mendersoftware/mender-client-qemu:master
+"""
+        )
+    with open(tmp_path / "git-versions.yml", "w") as fd:
+        fd.write(
+            """services:
+    mender-deployments:
+        image: mendersoftware/deployments:master
+    mender-client:
+        image: mendersoftware/mender-client-qemu:master
+"""
+        )
+    with open(tmp_path / "other-components.yml", "w") as fd:
+        fd.write(
+            """services:
+    mender-artifact:
+        image: mendersoftware/mender-artifact:master
+"""
+        )
+    untouched = os.stat(tmp_path / "other-components.yml").st_mtime_ns
+
+    diff = set_docker_compose_versions_to(
+        str(tmp_path),
+        {
+            "deployments": ("mender-3.0.0", "4.0.0"),
+            "deployments-enterprise": ("mender-3.0.0", "4.0.0"),
+            "mender-client-qemu": ("3.0.0", None),
+        },
+    )
+
+    with open(tmp_path / "docker-compose.yml") as fd:
+        assert fd.read() == (
+            """services:
+    mender-deployments:
+        image: mendersoftware/deployments:mender-3.0.0
+    mender-deployments-enterprise:
+        image: registry.mender.io/mendersoftware/deployments-enterprise:mender-3.0.0
+    mender-client:
+        image: mendersoftware/mender-client-qemu:3.0.0
+"""
+        )
+    with open(tmp_path / "git-versions.yml") as fd:
+        assert fd.read() == (
+            """services:
+    mender-deployments:
+        image: mendersoftware/deployments:4.0.0
+    mender-client:
+        image: mendersoftware/mender-client-qemu:master
+"""
+        )
+    assert os.stat(tmp_path / "other-components.yml").st_mtime_ns == untouched
+    assert "+        image: mendersoftware/deployments:4.0.0\n" in diff
+    assert "--- a/docker-compose.yml\n" in diff
+    assert "other-components.yml" not in diff
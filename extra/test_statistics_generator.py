@@ -12,10 +12,108 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import importlib.machinery
+import importlib.util
+import os
 import subprocess
+import sys
 
 import pytest
 
+EXTRA_DIR = os.path.dirname(os.path.abspath(__file__))
+STATISTICS_GENERATOR = os.path.join(EXTRA_DIR, "statistics-generator")
+GITDM_DIR = os.path.join(EXTRA_DIR, "gitdm")
+# The old statistics-generator, minus the mailmap check: "git log" piped into
+# gitdm, and the result into a sed script which makes Markdown tables of it.
+GITDM_PIPELINE = r"""
+git -c mailmap.file="$GITDM_DIR/mailmap" --no-pager log --perl-regexp \
+    --author='^((?!dependabot|mender-test-bot).*)$' --use-mailmap \
+    -p -M -C -C --no-merges "$@" \
+    -- '*' ':!vendor' ':!node_modules' ':!package-lock.json' ':!**/__snapshots__/**' |
+"$PYTHON" "$GITDM_DIR/gitdm/gitdm" -s -b "$GITDM_DIR" -l 10 |
+sed -nre '
+/^$/{
+  p
+  n
+  s/^(.*)$/| \1 | |/
+  p
+  c |---|---|
+  p
+  n
+}
+/%/{
+  s/^(.+)/| \1/
+  s/(.+)$/\1 |/
+  s/ {2,}/ | /
+}
+p
+
+'
+"""
+
+
+def load_statistics_generator():
+    loader = importlib.machinery.SourceFileLoader(
+        "statistics_generator", STATISTICS_GENERATOR
+    )
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    module.__file__ = STATISTICS_GENERATOR
+    loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="function")
+def statistics_repo(tmp_path):
+    """A small repository, where commits are mailmapped, filtered, and mapped to
+    employers, and where some lines start with "+". The range to look at is
+    base..HEAD."""
+
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="Northern.tech",
+        GIT_AUTHOR_EMAIL="info@northern.tech",
+        GIT_COMMITTER_NAME="Northern.tech",
+        GIT_COMMITTER_EMAIL="info@northern.tech",
+    )
+
+    def commit(author, message, files):
+        for name, content in files.items():
+            with open(os.path.join(tmp_path, name), "w") as fd:
+                fd.write(content)
+        subprocess.check_call(["git", "add", "."], cwd=tmp_path, env=env)
+        subprocess.check_call(
+            ["git", "commit", "-q", "--author", author, "-m", message],
+            cwd=tmp_path,
+            env=env,
+        )
+
+    subprocess.check_call(["git", "init", "-q"], cwd=tmp_path, env=env)
+    commit("Northern.tech <info@northern.tech>", "Base", {"base.txt": "base\n"})
+    subprocess.check_call(["git", "tag", "base"], cwd=tmp_path, env=env)
+    # The name comes from the mailmap, and the signoff of the author is not
+    # counted.
+    commit(
+        "ole <ole.orhagen@northern.tech>",
+        "Add a\n\nSigned-off-by: ole <ole.orhagen@northern.tech>",
+        {"a.txt": "one\n\nthree\n"},
+    )
+    commit(
+        "Marcin Chalczynski <marcin.chalczynski@rndity.com>",
+        "Change a\n\n"
+        + "Signed-off-by: Lluis Campos <lluis.campos@northern.tech>\n"
+        + "Reviewed-by: Ole Petter Orhagen <ole.orhagen@northern.tech>",
+        {"a.txt": "one\n+x\nfour\n"},
+    )
+    commit("dependabot[bot] <support@github.com>", "Bump", {"c.txt": "x\ny\nz\n"})
+    commit("Someone <someone@example.org>", "Add b", {"b.txt": "b1\nb2\n"})
+    commit(
+        "Ole Petter Orhagen <ole.orhagen@northern.tech>",
+        "Change b",
+        {"b.txt": "b1\nb2\nb3\n"},
+    )
+    return str(tmp_path)
+
 
 def test_post_process():
     """
@@ -100,3 +198,120 @@ A total of 2864 lines added, 1149 removed (delta 1715)
         ), "It seems the rendered Changelog has changed it's default look"
     except subprocess.CalledProcessError as e:
         pytest.fail(f"Got Process error: {e}")
+
+
+def test_statistics_of_repository(statistics_repo):
+    """
+    Test the statistics of a small repository, where commits are mailmapped,
+    filtered, and mapped to employers, and lines starting with "+" are not
+    counted.
+    """
+    output = subprocess.check_output(
+        [STATISTICS_GENERATOR, "--repo", "base..HEAD"], cwd=statistics_repo
+    )
+    assert (
+        output.decode("utf-8")
+        == """Processed 4 csets from 3 developers
+3 employers found
+A total of 7 lines added, 2 removed (delta 5)
+
+| Developers with the most changesets | |
+|---|---|
+| Ole Petter Orhagen | 2 (50.0%) |
+| Someone | 1 (25.0%) |
+| Marcin Chalczynski | 1 (25.0%) |
+
+| Developers with the most changed lines | |
+|---|---|
+| Ole Petter Orhagen | 4 (50.0%) |
+| Someone | 2 (25.0%) |
+| Marcin Chalczynski | 2 (25.0%) |
+
+| Developers with the most lines removed | |
+|---|---|
+| Marcin Chalczynski | 1 (50.0%) |
+
+| Developers with the most signoffs (total 1) | |
+|---|---|
+| Lluis Campos | 1 (100.0%) |
+
+| Developers with the most reviews (total 1) | |
+|---|---|
+| Ole Petter Orhagen | 1 (100.0%) |
+
+| Developers with the most test credits (total 0) | |
+|---|---|
+
+| Developers who gave the most tested-by credits (total 0) | |
+|---|---|
+
+| Developers with the most report credits (total 0) | |
+|---|---|
+
+| Developers who gave the most report credits (total 0) | |
+|---|---|
+
+| Top changeset contributors by employer | |
+|---|---|
+| Northern.tech | 2 (50.0%) |
+| RnDity | 1 (25.0%) |
+| someone@example.org | 1 (25.0%) |
+
+| Top lines changed by employer | |
+|---|---|
+| Northern.tech | 4 (50.0%) |
+| RnDity | 2 (25.0%) |
+| someone@example.org | 2 (25.0%) |
+
+| Employers with the most signoffs (total 1) | |
+|---|---|
+| Northern.tech | 1 (100.0%) |
+
+| Employers with the most hackers (total 3) | |
+|---|---|
+| Northern.tech | 1 (33.3%) |
+| RnDity | 1 (33.3%) |
+| someone@example.org | 1 (33.3%) |
+"""
+    )
+
+
+def test_statistics_match_gitdm(statistics_repo):
+    """
+    Test that the output is the same as the one of gitdm, which the statistics
+    used to be generated with.
+    """
+    if not os.path.exists(os.path.join(GITDM_DIR, "gitdm", "gitdm")):
+        pytest.skip("The gitdm submodule is not checked out")
+
+    env = dict(os.environ, GITDM_DIR=GITDM_DIR, PYTHON=sys.executable)
+    expected = subprocess.check_output(
+        ["bash", "-c", "set -o pipefail" + GITDM_PIPELINE, "gitdm", "base..HEAD"],
+        cwd=statistics_repo,
+        env=env,
+    )
+    output = subprocess.check_output(
+        [STATISTICS_GENERATOR, "--repo", "base..HEAD"], cwd=statistics_repo
+    )
+    assert output.decode("utf-8") == expected.decode("utf-8")
+
+
+def test_dry_run(statistics_repo):
+    """
+    Test that -n shows the Git log, with the authors mapped like in the
+    statistics.
+    """
+    output = subprocess.check_output(
+        [STATISTICS_GENERATOR, "--repo", "-n", "base..HEAD"], cwd=statistics_repo
+    ).decode("utf-8")
+    assert "Author: Ole Petter Orhagen <ole.orhagen@northern.tech>" in output
+    assert "Author: ole <" not in output
+    assert "dependabot" not in output
+    assert "+b3" in output
+
+
+def test_range_end():
+    statistics_generator = load_statistics_generator()
+    assert statistics_generator.range_end("3.0.0..3.1.0") == "3.1.0"
+    assert statistics_generator.range_end("3.0.0...3.1.0") == "3.1.0"
+    assert statistics_generator.range_end("origin/master") == "origin/master"